@@ -1,4 +1,10 @@
+import collections
+import datetime
+import json
 import math
+import re
+import struct
+import time
 import traceback
 import lldb
 import pdb
@@ -6,7 +12,36 @@ import shlex
 
 from functools import wraps
 
-g_qtVersion = None
+# Settings that can be changed with "mad set <name> <value>"
+g_settings = {
+    # Maximum number of characters read for a string summary, 0 means unlimited
+    'max-string-length': 10000,
+    # Maximum number of bytes read for the preview in a QByteArray summary, 0 shows only the size
+    'max-bytearray-length': 256,
+    # Let qdatetime_summary() call QDateTime::toString() in the inferior if decoding from memory fails
+    'datetime-expression-fallback': False,
+    # Never evaluate expressions in the inferior from a formatter, only read memory
+    'no-jit': False,
+    # Only enable the formatter categories of libraries that are loaded into a target, see updateCategories()
+    'lazy-categories': False,
+    # Number of summaries and decoded child lists kept until the process resumes, 0 disables it
+    'memo-size': 10000,
+    # Upper bound of the (estimated) memory held by remembered results
+    'memo-bytes': 64 * 1024 * 1024,
+    # Milliseconds PrefetchStopHook may spend computing summaries after each stop
+    'prefetch-budget': 50,
+    # Split containers with more elements into range children of this many elements, 0 disables paging
+    'page-size': 0,
+}
+
+# Shown instead of a value that could only be computed by evaluating an expression
+NO_JIT_PLACEHOLDER = '<no-jit>'
+
+# Upper bound for a single bulk read of container elements, larger containers are read in blocks
+BULK_READ_LIMIT = 16 * 1024 * 1024
+
+# Name of the child that shows a string summary without the length limit
+FULL_STRING_CHILD = '[full]'
 
 
 def stringFromSummary(summary):
@@ -22,39 +57,817 @@ def splitVersion(version):
     return tuple(map(int, version.split('.')))
 
 
+class FormatterStats:
+    '''Calls, wall time and memory traffic of one function wrapped by output_exceptions.'''
+
+    # Number of recent call durations kept to compute the p99
+    MAX_SAMPLES = 10000
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.samples = collections.deque(maxlen=self.MAX_SAMPLES)
+        self.bytesRead = 0
+        self.reads = 0
+
+    def record(self, seconds):
+        self.calls += 1
+        self.seconds += seconds
+        self.samples.append(seconds)
+
+    def p99(self):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[max(0, math.ceil(len(ordered) * 0.99) - 1)]
+
+    def asDict(self):
+        return {'calls': self.calls, 'seconds': self.seconds, 'p99': self.p99(),
+                'bytesRead': self.bytesRead, 'reads': self.reads}
+
+
+g_formatterStats = {}
+# Stats of the wrapped functions currently running, innermost last
+g_activeStats = []
+
+
+def countRead(bytesRead=0):
+    '''Attributes a memory read or lookup in the inferior (and the bytes it read) to the formatter that is
+    running. Only the lldbmad helpers (readMemory(), findType(), ...) count, plain SBValue calls do not.'''
+    if g_activeStats:
+        stats = g_activeStats[-1]
+        stats.reads += 1
+        stats.bytesRead += bytesRead
+
+
+def report_exceptions(func):
+    '''Prints exceptions instead of passing them to lldb, for functions that are not formatters.'''
+
+    @wraps(func)
+    def inner(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            print(traceback.format_exc())
+        return None
+
+    return inner
+
+
 def output_exceptions(func):
+    '''Prints exceptions instead of passing them to lldb, and records the stats of a formatter.'''
+    name = func.__qualname__
+
     @wraps(func)
     def inner(*args, **kwargs):
+        stats = g_formatterStats.get(name)
+        if stats is None:
+            stats = g_formatterStats[name] = FormatterStats()
+        g_activeStats.append(stats)
+        start = time.perf_counter()
         try:
             return func(*args, **kwargs)
         except Exception as e:
             print(traceback.format_exc())
+        finally:
+            stats.record(time.perf_counter() - start)
+            g_activeStats.pop()
         return None
 
     return inner
 
 
-def detectQtVersion(debugger):
-    global g_qtVersion
+class ExpressionStats:
+    '''Number and duration of the expressions a formatter evaluated in the inferior.'''
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.refused = 0
+
+
+g_expressionStats = {}
+
+
+def evaluateExpression(formatter, valobj, expression):
+    '''Evaluates an expression in the context of valobj on behalf of a formatter.
+    Returns None without touching the inferior if the "no-jit" setting is on.'''
+    stats = g_expressionStats.setdefault(formatter, ExpressionStats())
+    if g_settings['no-jit']:
+        stats.refused += 1
+        return None
+
+    countRead()
+    start = time.perf_counter()
     try:
-        if g_qtVersion is None:
-            target = debugger.GetSelectedTarget()
-            v = target.EvaluateExpression('qVersion()')
-            if v.IsValid() and v.summary:
-                g_qtVersion = splitVersion(v.summary.strip('"'))
-                print("Detected Qt Version:", g_qtVersion)
+        return valobj.EvaluateExpression(expression)
+    finally:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - start
+
+
+class TargetState:
+    '''Per-target caches. Anything derived from the module list is dropped when it changes.'''
+
+    def __init__(self, target):
+        self.target = target
+        self.types = {}
+        self.enums = {}
+        self.metaTypes = {}
+        self.fieldPaths = {}
+        self.metaObjects = {}
+        self.vtableMetaObjects = {}
+        self.qtcIds = None
+        self.qtVersion = None
+        self.qtVersionDetected = False
+        self.qtFallbackReported = False
+        self.qtImpls = None
+
+    def modulesChanged(self, event):
+        self.types.clear()
+        self.enums.clear()
+        self.metaTypes.clear()
+        self.fieldPaths.clear()
+        self.metaObjects.clear()
+        self.vtableMetaObjects.clear()
+        self.qtcIds = None
+        # A detected version stays valid, a fallback is retried once more modules are known
+        if not self.qtVersionDetected:
+            self.qtVersion = None
+            self.qtImpls = None
+
+    def getQtVersion(self):
+        if self.qtVersion is None:
+            version = detectQtVersion(self.target)
+            if version is not None:
+                self.qtVersionDetected = True
+                self.qtVersion = version
+                print("Detected Qt Version:", version)
             else:
-                v = target.EvaluateExpression('qtHookData[2]')
-                if v.IsValid():
-                    h = hex(v.unsigned)
-                    g_qtVersion = (int(h[2:][:-4]), int(h[2:][-4:-2]), int(h[2:][-2:]))
-                    print("Detected Qt Version:", g_qtVersion)
-    except Exception as e:
-        print("Auto-determining Qt Version failed:", e)
-        g_qtVersion = (6, 3, 0)
-        print("Falling back to hard-coded version:", g_qtVersion)
+                self.qtVersion = QT_FALLBACK_VERSION
+                if not self.qtFallbackReported:
+                    self.qtFallbackReported = True
+                    print("Auto-determining Qt Version failed, falling back to hard-coded version:", self.qtVersion)
+        return self.qtVersion
+
+    def qtImplementations(self):
+        if self.qtImpls is None:
+            self.qtImpls = qt_version.implementations(self.getQtVersion())
+        return self.qtImpls
+
+
+g_targetStates = []
+g_lastTargetState = None
+g_moduleListener = None
+
+
+def startModuleListener(debugger):
+    '''Subscribes to module load/unload events of all (current and future) targets.'''
+    global g_moduleListener
+    g_moduleListener = lldb.SBListener('lldbmad.modules')
+    g_moduleListener.StartListeningForEventClass(
+        debugger, lldb.SBTarget.GetBroadcasterClassName(),
+        lldb.SBTarget.eBroadcastBitModulesLoaded |
+        lldb.SBTarget.eBroadcastBitModulesUnloaded |
+        lldb.SBTarget.eBroadcastBitSymbolsLoaded)
+
+
+def processModuleEvents():
+    if g_moduleListener is None:
+        return
+
+    event = lldb.SBEvent()
+    debuggers = {}
+    while g_moduleListener.GetNextEvent(event):
+        target = lldb.SBTarget.GetTargetFromEvent(event)
+        for state in g_targetStates:
+            if state.target == target:
+                state.modulesChanged(event)
+        debugger = target.GetDebugger()
+        debuggers[debugger.GetID()] = debugger
+
+    # Handle a burst of module events with a single update
+    for debugger in debuggers.values():
+        updateCategories(debugger)
+
+
+class ModuleStopHook:
+    '''Stop hook applying module (un)loads before anything is shown for a stop, so the formatter categories
+    of a library that was just loaded are enabled before its values are formatted.'''
+
+    def __init__(self, target, extra_args, internal_dict):
+        pass
+
+    def handle_stop(self, exe_ctx, stream):
+        processModuleEvents()
+        return True
+
+
+def targetState(target):
+    '''Returns the caches of a target. Module events are applied before each stop (see ModuleStopHook), so
+    this is only a lookup, and formatting the same target again is a single comparison.'''
+    global g_lastTargetState
+    state = g_lastTargetState
+    if state is not None and state.target == target:
+        return state
+
+    for state in g_targetStates:
+        if state.target == target:
+            g_lastTargetState = state
+            return state
+
+    # Forget targets that have been deleted in the meantime
+    g_targetStates[:] = [state for state in g_targetStates if state.target.IsValid()]
+    state = g_lastTargetState = TargetState(target)
+    g_targetStates.append(state)
+    return state
+
+
+def findType(target, name):
+    '''Looks up a type by name. Hits and misses are remembered until the modules of the target change.'''
+    types = targetState(target).types
+    t = types.get(name)
+    if t is None:
+        countRead()
+        t = target.FindFirstType(name)
+        types[name] = t
+    return t
+
+
+def memoBytes(value):
+    '''Estimates the memory held by a remembered result. Objects holding larger buffers implement memoBytes().'''
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return 8 * len(value) + sum(len(item) for item in value if isinstance(item, bytes))
+    if hasattr(value, 'memoBytes'):
+        return value.memoBytes()
+    return 64
+
+
+class StopMemo:
+    '''LRU of formatter results, bounded by "memo-size" entries and "memo-bytes", valid while a process
+    stays stopped. Everything is dropped as soon as a new stop ID is seen.'''
+
+    def __init__(self):
+        # key => (value, estimated bytes)
+        self.entries = collections.OrderedDict()
+        self.bytes = 0
+        self.stops = {}
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+        self.stops.clear()
+
+    def lookup(self, key, compute):
+        maxSize = g_settings['memo-size']
+        if maxSize <= 0:
+            return compute()
+
+        processId, stopId = key[0], key[1]
+        current = self.stops.get(processId)
+        if current is not None and stopId < current:
+            # Computed for a stop that is already over
+            return compute()
+        if current != stopId:
+            # The process ran in the meantime
+            self.entries.clear()
+            self.bytes = 0
+            self.stops[processId] = stopId
+        elif key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+        value = compute()
+        size = memoBytes(value)
+        # compute() may have evaluated an expression, which resumes the process
+        if self.stops.get(processId) == stopId and key not in self.entries:
+            if hasattr(value, 'memoKey'):
+                value.memoKey = key
+            self.entries[key] = (value, size)
+            self.bytes += size
+            self.evict()
+        return value
+
+    def grow(self, key, size):
+        '''Adds "size" bytes to a remembered result that grows after it was computed.'''
+        if key not in self.entries:
+            return
+        value, oldSize = self.entries[key]
+        self.entries[key] = (value, oldSize + size)
+        self.entries.move_to_end(key)
+        self.bytes += size
+        self.evict()
+
+    def evict(self):
+        maxSize = g_settings['memo-size']
+        while self.entries and (len(self.entries) > maxSize or self.bytes > g_settings['memo-bytes']):
+            self.bytes -= self.entries.popitem(last=False)[1][1]
 
-    return g_qtVersion
+
+g_stopMemo = StopMemo()
+
+
+def stopMemoAt(process, address, kind, compute):
+    '''Returns compute(), remembered for the data of "kind" at "address" until the process resumes.'''
+    if not address or address == lldb.LLDB_INVALID_ADDRESS or not process.IsValid():
+        return compute()
+    # Expression evaluation resumes the process as well, so count those stops too
+    key = (process.GetUniqueID(), process.GetStopID(True), address, kind)
+    return g_stopMemo.lookup(key, compute)
+
+
+def stopMemo(valobj, kind, compute):
+    '''Returns compute(), remembered for the value at the same load address and type until the process resumes.
+    Values that do not live in the inferior\'s memory (e.g. created from data) are not remembered.'''
+    return stopMemoAt(valobj.GetProcess(), valobj.GetLoadAddress(), (valobj.GetTypeName(), kind), compute)
+
+
+def stop_memoized(func):
+    '''Remembers the result of a summary function until the process resumes, see stopMemo().'''
+    name = func.__qualname__
+
+    @wraps(func)
+    def inner(valobj, *args):
+        # Range children of paged containers share the address of the container, but not its summary.
+        # Anything else is shared between all values at the same address, e.g. a local and a pointee.
+        valobjName = valobj.GetName() or ''
+        kind = (name, valobjName) if RANGE_NAME.match(valobjName) else name
+        return stopMemo(valobj, kind, lambda: func(valobj, *args))
+
+    return inner
+
+
+QT_CORE_MODULE = re.compile(r'^(lib)?Qt(\d)?Core(d)?(\.|$)')
+QT_GUI_MODULE = re.compile(r'^(lib)?Qt(\d)?Gui(d)?(\.|$)')
+QT_FALLBACK_VERSION = (6, 3, 0)
+
+# Qt private classes the formatters read, the library defining them and the members they need.
+PRIVATE_TYPES = {
+    'QFilePrivate': (QT_CORE_MODULE, ('fileName', 'openMode', 'error')),
+    'QTextCursorPrivate': (QT_GUI_MODULE, ('position', 'anchor')),
+    'QCborContainerPrivate': (QT_CORE_MODULE, ('usedData', 'data', 'elements')),
+    'QtPrivate::QMetaTypeInterface': (QT_CORE_MODULE, ('typeId', 'name')),
+}
+
+# Layouts of the private classes for Qt builds without their debug info (e.g. distribution packages).
+# Keyed by (Qt major, Qt minor, pointer size), each member maps to (offset, type name). A version without
+# a table uses the closest older one, so there are only tables for the versions where a layout changes.
+# QFilePrivate has no 32 bit tables, its qint64 members are aligned differently by i386 and ARM.
+# tools/genlayouts.py generates the tables from debug builds and rewrites the block between the markers.
+# BEGIN PRIVATE_LAYOUTS
+PRIVATE_LAYOUTS = {
+    (5, 15, 4): {
+        'QCborContainerPrivate': {
+            'data': (8, 'QByteArray'),
+            'elements': (12, 'QVector<QtCbor::Element>'),
+            'usedData': (4, 'QByteArray::size_type'),
+        },
+        'QTextCursorPrivate': {
+            'anchor': (20, 'int'),
+            'position': (16, 'int'),
+        },
+    },
+    (5, 15, 8): {
+        'QCborContainerPrivate': {
+            'data': (8, 'QByteArray'),
+            'elements': (16, 'QVector<QtCbor::Element>'),
+            'usedData': (4, 'QByteArray::size_type'),
+        },
+        'QFilePrivate': {
+            'error': (212, 'QFileDevice::FileError'),
+            'fileName': (224, 'QString'),
+            'openMode': (88, 'QIODevice::OpenMode'),
+        },
+        'QTextCursorPrivate': {
+            'anchor': (28, 'int'),
+            'position': (24, 'int'),
+        },
+    },
+    (6, 2, 4): {
+        'QCborContainerPrivate': {
+            'data': (8, 'QByteArray'),
+            'elements': (20, 'QList<QtCbor::Element>'),
+            'usedData': (4, 'qsizetype'),
+        },
+        'QTextCursorPrivate': {
+            'anchor': (20, 'int'),
+            'position': (16, 'int'),
+        },
+        'QtPrivate::QMetaTypeInterface': {
+            'name': (20, 'const char *'),
+            'typeId': (12, 'QBasicAtomicInt'),
+        },
+    },
+    (6, 2, 8): {
+        'QCborContainerPrivate': {
+            'data': (16, 'QByteArray'),
+            'elements': (40, 'QList<QtCbor::Element>'),
+            'usedData': (8, 'qsizetype'),
+        },
+        'QFilePrivate': {
+            'error': (292, 'QFileDevice::FileError'),
+            'fileName': (304, 'QString'),
+            'openMode': (264, 'QIODeviceBase::OpenMode'),
+        },
+        'QTextCursorPrivate': {
+            'anchor': (28, 'int'),
+            'position': (24, 'int'),
+        },
+        'QtPrivate::QMetaTypeInterface': {
+            'name': (24, 'const char *'),
+            'typeId': (12, 'QBasicAtomicInt'),
+        },
+    },
+    (6, 3, 8): {
+        'QCborContainerPrivate': {
+            'data': (16, 'QByteArray'),
+            'elements': (40, 'QList<QtCbor::Element>'),
+            'usedData': (8, 'qsizetype'),
+        },
+        'QFilePrivate': {
+            'error': (412, 'QFileDevice::FileError'),
+            'fileName': (424, 'QString'),
+            'openMode': (384, 'QIODeviceBase::OpenMode'),
+        },
+        'QTextCursorPrivate': {
+            'anchor': (28, 'int'),
+            'position': (24, 'int'),
+        },
+        'QtPrivate::QMetaTypeInterface': {
+            'name': (24, 'const char *'),
+            'typeId': (12, 'QBasicAtomicInt'),
+        },
+    },
+}
+# END PRIVATE_LAYOUTS
+
+
+def privateLayout(target, typeName):
+    '''Returns the built-in {member: (offset, type name)} of a Qt private class, or None.
+    Uses the table of the same major version with the closest older minor version.'''
+    major, minor = targetState(target).getQtVersion()[:2]
+    ptrSize = target.GetAddressByteSize()
+    keys = [key for key, layouts in PRIVATE_LAYOUTS.items()
+            if key[0] == major and key[2] == ptrSize and typeName in layouts]
+    if not keys:
+        return None
+    older = [key for key in keys if key[1] <= minor]
+    return PRIVATE_LAYOUTS[max(older) if older else min(keys)][typeName]
+
+
+def findPrivateType(target, name):
+    '''Looks up a Qt private class in the library defining it, instead of searching all modules.
+    All modules are only searched if that library is not loaded (e.g. static builds).'''
+    if name not in PRIVATE_TYPES:
+        return findType(target, name)
+
+    types = targetState(target).types
+    t = types.get(name)
+    if t is None:
+        pattern = PRIVATE_TYPES[name][0]
+        modules = [m for m in target.module_iter() if pattern.match(m.GetFileSpec().GetFilename() or '')]
+        if not modules:
+            return findType(target, name)
+        for module in modules:
+            countRead()
+            t = module.FindFirstType(name)
+            if t.IsValid():
+                break
+        types[name] = t
+    return t
+
+
+def privateOffsets(target, typeName, members):
+    '''Returns the offsets of members of a Qt private class, from the debug info or the built-in tables.
+    Missing offsets are None.'''
+    offsets = tuple(fieldOffset(findPrivateType(target, typeName), name) for name in members)
+    if None not in offsets:
+        return offsets
+    layout = privateLayout(target, typeName) or {}
+    return tuple(layout[name][0] if name in layout else None for name in members)
+
+
+def unpackFormat(target, fmt):
+    '''Prefixes a struct format with the byte order of the target.'''
+    return ('>' if target.GetByteOrder() == lldb.eByteOrderBig else '<') + fmt
+
+
+def pointerFormat(target, count=1):
+    return unpackFormat(target, ('Q' if target.GetAddressByteSize() == 8 else 'I') * count)
+
+
+def readMemory(process, address, size):
+    '''Reads a block of memory of the inferior, returns None if it cannot be read.'''
+    if size == 0:
+        return b''
+    countRead(size)
+    error = lldb.SBError()
+    data = process.ReadMemory(address, size, error)
+    if error.Fail() or data is None or len(data) != size:
+        return None
+    return data
+
+
+STRING_ESCAPES = {ord('"'): '\\"', ord('\\'): '\\\\', ord('\n'): '\\n', ord('\r'): '\\r', ord('\t'): '\\t'}
+STRING_ESCAPES.update({c: '\\x%02x' % c for c in range(0x20) if c not in STRING_ESCAPES})
+
+
+def escapeString(s):
+    return s.translate(STRING_ESCAPES)
+
+
+def readUtf16String(process, address, size, limit=None):
+    '''Reads "size" UTF-16 code units with a single memory read.
+
+    At most "limit" code units are read (default: the "max-string-length" setting, 0 = unlimited).
+    Returns (string, truncated), string is None if the memory is not readable.
+    '''
+    if limit is None:
+        limit = g_settings['max-string-length']
+    truncated = 0 < limit < size
+    count = limit if truncated else size
+    data = readMemory(process, address, count * 2)
+    if data is None:
+        return None, truncated
+
+    codec = 'utf-16-be' if process.GetByteOrder() == lldb.eByteOrderBig else 'utf-16-le'
+    return data.decode(codec, errors='replace'), truncated
+
+
+def utf16Summary(process, address, size, limit=None):
+    '''Returns the quoted summary of a UTF-16 string, with "..." appended if it was cut off.'''
+    if size <= 0:
+        return '""'
+
+    s, truncated = readUtf16String(process, address, size, limit)
+    if s is None:
+        return None
+    return '"%s"%s' % (escapeString(s), '...' if truncated else '')
+
+
+def createValueFromBytes(valobj, name, data, type):
+    '''Creates a value of "type" from raw bytes that were read from the inferior.'''
+    target = valobj.GetTarget()
+    sbData = lldb.SBData()
+    error = lldb.SBError()
+    sbData.SetData(error, data, target.GetByteOrder(), target.GetAddressByteSize())
+    countRead()
+    return valobj.CreateValueFromData(name, sbData, type)
+
+
+def readPointer(process, address):
+    data = readMemory(process, address, process.GetAddressByteSize())
+    if data is None:
+        return None
+    return struct.unpack(pointerFormat(process.GetTarget()), data)[0]
+
+
+def alignUp(value, alignment):
+    return (value + alignment - 1) // alignment * alignment
+
+
+def typeAlignment(t):
+    '''Returns the alignment of a type. SBType.GetByteAlign() only exists in recent lldb versions.'''
+    getByteAlign = getattr(t, 'GetByteAlign', None)
+    if getByteAlign and getByteAlign():
+        return getByteAlign()
+
+    t = t.GetCanonicalType()
+    if t.IsArrayType():
+        return typeAlignment(t.GetArrayElementType())
+    if t.GetTypeClass() in (lldb.eTypeClassClass, lldb.eTypeClassStruct, lldb.eTypeClassUnion):
+        alignments = [typeAlignment(t.GetFieldAtIndex(i).GetType()) for i in range(t.GetNumberOfFields())]
+        alignments += [typeAlignment(t.GetDirectBaseClassAtIndex(i).GetType())
+                       for i in range(t.GetNumberOfDirectBaseClasses())]
+        return max(alignments, default=1)
+    return max(1, min(t.GetByteSize(), 16))
+
+
+def fieldOffset(t, name):
+    '''Returns the byte offset of a direct field of a type, or None.'''
+    for i in range(t.GetNumberOfFields()):
+        field = t.GetFieldAtIndex(i)
+        if field.GetName() == name:
+            return field.GetOffsetInBytes()
+    return None
+
+
+def findField(t, name):
+    '''Returns (offset, type) of a member of a type or of one of its base classes, or None.'''
+    t = t.GetCanonicalType()
+    for i in range(t.GetNumberOfFields()):
+        field = t.GetFieldAtIndex(i)
+        if field.GetName() == name:
+            return field.GetOffsetInBytes(), field.GetType()
+    for i in range(t.GetNumberOfDirectBaseClasses()):
+        base = t.GetDirectBaseClassAtIndex(i)
+        found = findField(base.GetType(), name)
+        if found is not None:
+            return base.GetOffsetInBytes() + found[0], found[1]
+    return None
+
+
+FIELD_PATH_ROOT = re.compile(r'^[\w:]+')
+FIELD_PATH_STEP = re.compile(r'(\.|->)(?:\(([\w:]+)\))?(\w+)')
+
+
+class FieldPath:
+    '''A member access path like "QObject.d_ptr.d->(QObjectPrivate)extraData->objectName", compiled into
+    pointer hops and byte offsets from the debug info.
+
+    "." accesses a member, "->" follows the pointer before accessing a member of the pointee, and "(Type)"
+    treats the pointee as another type (e.g. a private class). References are followed implicitly.
+    '''
+
+    def __init__(self, target, path):
+        self.path = path
+        self.valid = False
+        # Offsets at which a pointer is read, each relative to the address the previous one led to
+        self.hops = []
+        # Offset of the member after the last hop
+        self.offset = 0
+        # Type of the member, None if it is only known from the built-in layout tables
+        self.type = None
+
+        root = FIELD_PATH_ROOT.match(path)
+        t = findType(target, root.group(0)) if root else None
+        pos = root.end() if root else 0
+        offset = 0
+        while t is not None and t.IsValid() and pos < len(path):
+            step = FIELD_PATH_STEP.match(path, pos)
+            if not step:
+                return
+            op, cast, name = step.groups()
+            if op == '->':
+                if not t.GetCanonicalType().IsPointerType():
+                    return
+                self.hops.append(offset)
+                offset = 0
+                t = t.GetCanonicalType().GetPointeeType()
+            layout = None
+            if cast:
+                t = findPrivateType(target, cast)
+                if not t.IsValid():
+                    layout = privateLayout(target, cast)
+                    if layout is None:
+                        return
+            if layout is not None:
+                # No debug info for the private class, take the member from the built-in tables
+                if name not in layout:
+                    return
+                offset += layout[name][0]
+                t = findType(target, layout[name][1])
+                pos = step.end()
+                if not t.IsValid() and pos == len(path):
+                    t = None
+                    break
+                continue
+            found = findField(t, name)
+            if found is None:
+                return
+            offset += found[0]
+            t = found[1]
+            if t.GetCanonicalType().IsReferenceType():
+                self.hops.append(offset)
+                offset = 0
+                t = t.GetCanonicalType().GetDereferencedType()
+            pos = step.end()
+
+        if pos < len(path) or (t is not None and not t.IsValid()):
+            return
+        self.offset = offset
+        self.type = t
+        self.valid = True
+
+    def address(self, process, base, hops=None):
+        '''Returns the address of the member for the object at "base", or None if a pointer on the way is null.'''
+        if not self.valid:
+            return None
+        address = base
+        for hop in self.hops if hops is None else hops:
+            address = readPointer(process, address + hop)
+            if not address:
+                return None
+        return address + self.offset
+
+    def valueAddress(self, valobj):
+        '''Returns the address of the member for a value. Values created from data take the first pointer
+        from their data.'''
+        if not self.valid:
+            return None
+        process = valobj.GetProcess()
+        value = valobj.GetNonSyntheticValue()
+        if value.GetType().IsPointerType():
+            base = value.GetValueAsUnsigned()
+            return self.address(process, base) if base else None
+        base = value.GetLoadAddress()
+        if base != lldb.LLDB_INVALID_ADDRESS:
+            return self.address(process, base)
+        if not self.hops:
+            return None
+
+        error = lldb.SBError()
+        first = value.GetData().GetAddress(error, self.hops[0])
+        if error.Fail() or not first:
+            return None
+        return self.address(process, first, self.hops[1:])
+
+
+def fieldPath(target, path):
+    '''Returns the compiled FieldPath for a path, cached per target until its modules change.'''
+    paths = targetState(target).fieldPaths
+    compiled = paths.get(path)
+    if compiled is None:
+        compiled = paths[path] = FieldPath(target, path)
+    return compiled
+
+
+def readInt(process, address):
+    data = readMemory(process, address, 4)
+    if data is None:
+        return None
+    return struct.unpack(unpackFormat(process.GetTarget(), 'i'), data)[0]
+
+
+def walkTree(process, root, leftOffset, rightOffset, limit, sentinel=0):
+    '''Walks a binary tree in order without recursion and returns the addresses of its nodes.
+
+    Each node is read once. At most "limit" nodes are returned, which also protects against corrupted trees.
+    '''
+    fmt = pointerFormat(process.GetTarget())
+    readSize = max(leftOffset, rightOffset) + process.GetAddressByteSize()
+
+    nodes = []
+    stack = []
+    node = root
+    while (stack or (node != 0 and node != sentinel)) and len(nodes) < limit:
+        while node != 0 and node != sentinel:
+            data = readMemory(process, node, readSize)
+            if data is None or len(stack) > limit:
+                return nodes
+            stack.append((node, struct.unpack_from(fmt, data, rightOffset)[0]))
+            node = struct.unpack_from(fmt, data, leftOffset)[0]
+
+        node, right = stack.pop()
+        nodes.append(node)
+        node = right
+    return nodes
+
+
+def findQtCoreModule(target):
+    for module in target.module_iter():
+        match = QT_CORE_MODULE.match(module.GetFileSpec().GetFilename() or '')
+        if match:
+            return module, match
+    return None, None
+
+
+def qtVersionFromHookData(target):
+    '''Reads QT_VERSION from the static qtHookData array of QtCore.'''
+    symbols = target.FindSymbols('qtHookData')
+    ptrSize = target.GetAddressByteSize()
+    for i in range(symbols.GetSize()):
+        address = symbols.GetContextAtIndex(i).GetSymbol().GetStartAddress()
+        error = lldb.SBError()
+        data = target.ReadMemory(address, 3 * ptrSize, error)
+        if error.Fail() or not data or len(data) != 3 * ptrSize:
+            continue
+
+        # qtHookData = { HookDataVersion, HookDataSize, QT_VERSION, ... }
+        hookDataVersion, hookDataSize, version = struct.unpack(pointerFormat(target, 3), data)
+        if hookDataVersion < 1 or hookDataSize < 3 or (version >> 16) not in (5, 6):
+            continue
+        return ((version >> 16) & 0xff, (version >> 8) & 0xff, version & 0xff)
+    return None
+
+
+def qtVersionFromModule(module, match):
+    '''Derives the Qt version from the file name (soname) or the version of the QtCore module.'''
+    fileName = module.GetFileSpec().GetFilename()
+    soVersion = re.search(r'\.so\.(\d+)\.(\d+)\.(\d+)$', fileName)
+    if soVersion:
+        return splitVersion('.'.join(soVersion.groups()))
+
+    major = int(match.group(2)) if match.group(2) else None
+    version = tuple(module.GetVersion())
+    if len(version) >= 3 and version[0] in (5, 6) and major in (None, version[0]):
+        return version[:3]
+
+    if major:
+        return (major, 0, 0)
+    return None
+
+
+def detectQtVersion(target):
+    '''Determines the Qt version of a target from static data, without running code in the inferior.'''
+    version = qtVersionFromHookData(target)
+    if version is None:
+        module, match = findQtCoreModule(target)
+        if module:
+            version = qtVersionFromModule(module, match)
+    return version
 
 
 class qt_version:
@@ -72,57 +885,216 @@ class qt_version:
     # This is the decorator function. It is called once for every instance of @qt_version being used.
     def __call__(self, func):
         # If we haven't seen this function yet, add it to the dictionary.
-        if not func.__qualname__ in self._func_versions:
-            self._func_versions[func.__qualname__] = {}
+        name = func.__qualname__
+        if not name in self._func_versions:
+            self._func_versions[name] = {}
 
         # Add the function to the dictionary.
-        self._func_versions[func.__qualname__][self._version] = func
+        self._func_versions[name][self._version] = func
 
-        # This is the wrapper function that is actually called.
+        # This is the wrapper function that is actually called. The implementations matching the
+        # Qt version of a target are bound once per target (see TargetState.qtImplementations()),
+        # so this only needs to pick the function out of that table.
+        # The target is taken from the SBValue or SBProcess passed in. Providers keep the table of their
+        # "valobj" after the first call, so their methods do not look up the target again.
         @wraps(func)
         def wrapped(*args, **kwargs):
-            v = detectQtVersion(lldb.debugger)
-            # func.__qualname__ is captured once when __call__ is called.
+            owner = args[0]
+            impls = getattr(owner, 'qtImpls', None)
+            if impls is None:
+                valobj = getattr(owner, 'valobj', None)
+                if valobj is None:
+                    impls = targetState(owner.GetTarget()).qtImplementations()
+                else:
+                    impls = owner.qtImpls = targetState(valobj.GetTarget()).qtImplementations()
+            impl = impls.get(name)
+            if impl is None:
+                raise Exception('"%s" is not implemented for Qt version %s' % (name, impls.version[0]))
+
+            return impl(*args, **kwargs)
+        return wrapped
 
-            if not v[0] in self._func_versions[func.__qualname__]:
-                raise Exception('"%s" is not implemented for Qt version %s' % (func.__qualname__, v[0]))
+    @classmethod
+    def implementations(cls, version):
+        '''Returns the table of functions implemented for the given Qt version.'''
+        impls = QtImplementations((name, versions[version[0]])
+                                  for name, versions in cls._func_versions.items() if version[0] in versions)
+        impls.version = version
+        return impls
+
+
+class QtImplementations(dict):
+    version = None
+
+
+# Name of a synthetic child that groups the elements first..last of a paged container
+RANGE_NAME = re.compile(r'^\[(\d+)\.\.(\d+)\]$')
+
+
+class PagedChildren:
+    '''Mixin for container providers that splits large containers into range children when the
+    "page-size" setting is on.
+
+    A range child "[first..last]" is the container itself under another name, so lldb gives it the
+    same provider, which then only shows that range (again split into ranges if it is still too large).
+    Providers call page() from update() and implement element_child(index) for the element with the
+    absolute index "index".
+    '''
+
+    # Elements first..first+count-1 are shown, grouped into ranges of "span" elements
+    first = 0
+    count = 0
+    span = 1
+
+    def page(self, length):
+        self.first, self.count, self.span = 0, length, 1
+        match = RANGE_NAME.match(self.valobj.GetName() or '')
+        if match:
+            first, last = int(match.group(1)), int(match.group(2))
+            self.first, self.count = first, max(0, min(last, length - 1) - first + 1)
+
+        pageSize = g_settings['page-size']
+        if pageSize > 0 and self.count > pageSize:
+            self.span = pageSize
+            while (self.count + self.span - 1) // self.span > pageSize:
+                self.span *= pageSize
+
+    def is_range(self):
+        return RANGE_NAME.match(self.valobj.GetName() or '') is not None
+
+    def num_paged_children(self):
+        return (self.count + self.span - 1) // self.span
+
+    def range_child(self, index):
+        first = self.first + index * self.span
+        last = min(first + self.span, self.first + self.count) - 1
+        name = '[%i..%i]' % (first, last)
+        value = self.valobj.GetNonSyntheticValue()
+        address = value.GetLoadAddress()
+        if address != lldb.LLDB_INVALID_ADDRESS:
+            return self.valobj.CreateValueFromAddress(name, address, value.GetType())
+        return self.valobj.CreateValueFromData(name, value.GetData(), value.GetType())
+
+    def element_child_index(self, element):
+        '''Returns the index of the child for element "element". Elements inside range children get an
+        index past the visible children, which paged_child() still resolves to the element. -1 if the
+        element is not in this range.'''
+        if not self.first <= element < self.first + self.count:
+            return -1
+        if self.span == 1:
+            return element - self.first
+        return self.num_paged_children() + element - self.first
+
+    def paged_child_index(self, name):
+        '''Resolves "[N]" to element N, even if it is inside a range child, and "[first..last]" to the
+        range child of that name.'''
+        match = RANGE_NAME.match(name)
+        if match:
+            first = int(match.group(1)) - self.first
+            if self.span == 1 or not 0 <= first < self.count or first % self.span != 0:
+                return -1
+            return first // self.span
+        try:
+            element = int(name.lstrip('[').rstrip(']'))
+        except ValueError:
+            return -1
+        return self.element_child_index(element)
 
-            return self._func_versions[func.__qualname__][v[0]](*args, **kwargs)
-        return wrapped
+    def paged_child(self, index):
+        if index < 0:
+            return None
+        numChildren = self.num_paged_children()
+        if index >= numChildren:
+            # An element inside a range child, see element_child_index()
+            element = index - numChildren
+            return self.element_child(self.first + element) if element < self.count else None
+        if self.span > 1:
+            return self.range_child(index)
+        return self.element_child(self.first + index)
+
+
+@output_exceptions
+def paged_size_summary(valobj, idict, options):
+    '''"size=N" for the containers using PagedChildren, whose children may be ranges instead of elements.'''
+    match = RANGE_NAME.match(valobj.GetName() or '')
+    if match:
+        return 'size=%i' % (int(match.group(2)) - int(match.group(1)) + 1)
 
+    numChildren = valobj.GetNumChildren()
+    if g_settings['page-size'] <= 0 or numChildren == 0:
+        return 'size=%i' % numChildren
 
-class QListChildProvider(lldb.SBSyntheticValueProvider):
+    first = RANGE_NAME.match(valobj.GetChildAtIndex(0).GetName() or '')
+    last = RANGE_NAME.match(valobj.GetChildAtIndex(numChildren - 1).GetName() or '')
+    if not first or not last:
+        return 'size=%i' % numChildren
+    return 'size=%i' % (int(last.group(2)) - int(first.group(1)) + 1)
+
+
+class QListChildProvider(PagedChildren, lldb.SBSyntheticValueProvider):
     def __init__(self, valobj, internal_dict):
         self.valobj = valobj
         self.type = None
         self.innerType = None
         self.length = 0
         self.begin = 0
+        # Address, stride and type of the elements (or element pointers) in memory
+        self.address = 0
+        self.step = 0
+        self.childType = None
+        self.childSize = 0
+        # Blocks of raw element data and the children built from them, valid for one stop
+        self.cacheKey = None
+        self.blocks = {}
+        self.children = {}
 
     def num_children(self):
-        return self.length  # self.dLen.unsigned
+        return self.num_paged_children()
 
     def get_child_index(self, name):
         if name == '$$dereference$$':
             return 0
-        try:
-            return int(name.lstrip('[').rstrip(']'))
-        except:
-            return -1
+        return self.paged_child_index(name)
+
+    def block(self, index):
+        '''Returns the raw data of the block containing element "index" and the element's offset in it.'''
+        blockLength = max(1, BULK_READ_LIMIT // self.step)
+        if g_settings['page-size'] > 0:
+            # Expanding a range only reads that range
+            blockLength = min(blockLength, g_settings['page-size'])
+        blockIndex, blockOffset = divmod(index, blockLength)
+        data = self.blocks.get(blockIndex)
+        if data is None:
+            first = blockIndex * blockLength
+            count = min(blockLength, self.length - first)
+            data = readMemory(self.valobj.GetProcess(), self.address + first * self.step, count * self.step)
+            self.blocks[blockIndex] = data
+        return data, blockOffset * self.step
 
     @output_exceptions
-    @qt_version(6)
     def get_child_at_index(self, index):
-        offset = (index * self.innerType.GetByteSize())
-        return self.ptr.CreateChildAtOffset('[' + str(index) + ']', offset, self.innerType)
+        return self.paged_child(index)
 
-    @output_exceptions
-    @qt_version(5)
-    def get_child_at_index(self, index):
-        offset = (self.begin * self.step) + (index * self.step)
-        type = self.innerType if self.isInternal else self.innerType.GetPointerType()
-        res = self.ptr.CreateValueFromAddress('[' + str(index) + ']', self.ptr.GetLoadAddress() + offset, type)
-        return res
+    def element_child(self, index):
+        if index < 0 or index >= self.length or self.step == 0:
+            return None
+
+        key = (self.valobj.GetProcess().GetStopID(), self.address, self.length)
+        if key != self.cacheKey:
+            self.cacheKey = key
+            # Blocks of up to BULK_READ_LIMIT bytes are too large for the stop memo
+            self.blocks = {}
+            self.children = {}
+
+        child = self.children.get(index)
+        if child is None:
+            data, offset = self.block(index)
+            if data is None:
+                return None
+            child = createValueFromBytes(self.valobj, '[%i]' % index,
+                                         data[offset:offset + self.childSize], self.childType)
+            self.children[index] = child
+        return child
 
     @output_exceptions
     @qt_version(6)
@@ -132,6 +1104,12 @@ class QListChildProvider(lldb.SBSyntheticValueProvider):
         self.innerType = self.ptr.GetType().GetPointeeType()
         self.length = self.valobj.GetChildMemberWithName('d').GetChildMemberWithName('size').unsigned
 
+        self.address = self.ptr.unsigned
+        self.step = self.innerType.GetByteSize()
+        self.childType = self.innerType
+        self.childSize = self.step
+        self.page(self.length)
+
     @output_exceptions
     @qt_version(5)
     def update(self):
@@ -149,106 +1127,460 @@ class QListChildProvider(lldb.SBSyntheticValueProvider):
         self.begin = begin
         self.length = end - self.begin
 
+        # d.array[begin..end) holds either the elements themselves or pointers to them
+        self.address = self.ptr.GetLoadAddress() + self.begin * self.step
+        self.childType = self.innerType if self.isInternal else self.innerType.GetPointerType()
+        self.childSize = self.childType.GetByteSize()
+        self.page(self.length)
+
     def has_children(self):
         return True
 
 
+# QMetaType::Type ids of built-in types: id -> (name as Qt reports it, lldb basic type or type name)
+QMETATYPE_BUILTINS = {
+    1: ('bool', lldb.eBasicTypeBool),
+    2: ('int', lldb.eBasicTypeInt),
+    3: ('uint', lldb.eBasicTypeUnsignedInt),
+    4: ('qlonglong', lldb.eBasicTypeLongLong),
+    5: ('qulonglong', lldb.eBasicTypeUnsignedLongLong),
+    6: ('double', lldb.eBasicTypeDouble),
+    7: ('QChar', 'QChar'),
+    8: ('QVariantMap', 'QVariantMap'),
+    9: ('QVariantList', 'QVariantList'),
+    10: ('QString', 'QString'),
+    11: ('QStringList', 'QStringList'),
+    12: ('QByteArray', 'QByteArray'),
+    13: ('QBitArray', 'QBitArray'),
+    14: ('QDate', 'QDate'),
+    15: ('QTime', 'QTime'),
+    16: ('QDateTime', 'QDateTime'),
+    17: ('QUrl', 'QUrl'),
+    19: ('QRect', 'QRect'),
+    20: ('QRectF', 'QRectF'),
+    21: ('QSize', 'QSize'),
+    22: ('QSizeF', 'QSizeF'),
+    23: ('QLine', 'QLine'),
+    24: ('QLineF', 'QLineF'),
+    25: ('QPoint', 'QPoint'),
+    26: ('QPointF', 'QPointF'),
+    28: ('QVariantHash', 'QVariantHash'),
+    32: ('long', lldb.eBasicTypeLong),
+    33: ('short', lldb.eBasicTypeShort),
+    34: ('char', lldb.eBasicTypeChar),
+    35: ('ulong', lldb.eBasicTypeUnsignedLong),
+    36: ('ushort', lldb.eBasicTypeUnsignedShort),
+    37: ('uchar', lldb.eBasicTypeUnsignedChar),
+    38: ('float', lldb.eBasicTypeFloat),
+    40: ('signed char', lldb.eBasicTypeSignedChar),
+    51: ('std::nullptr_t', lldb.eBasicTypeNullPtr),
+}
+
+
+def builtinMetaType(target, typeId):
+    '''Returns (name, SBType) of a built-in QMetaType id without looking up its name, or None.'''
+    builtin = QMETATYPE_BUILTINS.get(typeId)
+    if builtin is None:
+        return None
+    name, type = builtin
+    return name, target.GetBasicType(type) if isinstance(type, int) else findType(target, type)
+
+
+def resolveMetaTypeInterface(target, process, address):
+    # QMetaTypeInterface { ushort revision; ushort alignment; uint size; uint flags;
+    #                      QBasicAtomicInt typeId; MetaObjectFn metaObjectFn; const char *name; ... }
+    ptrSize = target.GetAddressByteSize()
+    typeIdOffset, nameOffset = privateOffsets(target, 'QtPrivate::QMetaTypeInterface', ('typeId', 'name'))
+    if typeIdOffset is None or nameOffset is None:
+        typeIdOffset, nameOffset = 12, 16 + ptrSize
+
+    header = readMemory(process, address, nameOffset + ptrSize)
+    if header is None:
+        return None, None
+
+    builtin = builtinMetaType(target, struct.unpack_from(unpackFormat(target, 'i'), header, typeIdOffset)[0])
+    if builtin:
+        return builtin
+
+    error = lldb.SBError()
+    namePtr = struct.unpack_from(pointerFormat(target), header, nameOffset)[0]
+    countRead()
+    tName = process.ReadCStringFromMemory(namePtr, 1024, error)
+    if error.Fail() or not tName:
+        return None, None
+    tName = tName.replace(',', ', ').replace('>>', '> >')
+    return tName, findType(target, tName)
+
+
+def qmetatypeInterface(target, process, address):
+    '''Resolves a QtPrivate::QMetaTypeInterface address to (name, SBType), cached per target.'''
+    metaTypes = targetState(target).metaTypes
+    resolved = metaTypes.get(address)
+    if resolved is None:
+        resolved = resolveMetaTypeInterface(target, process, address)
+        metaTypes[address] = resolved
+    return resolved
+
+
 class QVariantChildProvider:
     def __init__(self, valobj, idict):
         self.valobj = valobj
+        # (type name, SBType, payload address or None, inline payload data)
+        self.payload = None
 
     def hasChildren(self):
         return True
 
-    def get_qvariant_type(self):
-        try:
-            target = lldb.debugger.GetSelectedTarget()
-            typeAddr = self.packedType.unsigned << 2
-            metaType = target.FindFirstType('QtPrivate::QMetaTypeInterface')
-            mtAddr = lldb.SBAddress(typeAddr, target)
-            mtd = target.CreateValueFromAddress('mt', mtAddr, metaType)
-            mtdName = mtd.GetChildMemberWithName('name')
-            if mtdName.summary == None:
-                return None, None
-            tName = mtdName.summary.strip('"')
-            tName = tName.replace(',', ', ').replace('>>', '> >')
-            vType = target.FindFirstType(tName)
-            return tName, vType
-        except Exception as e:
-            print("Error retrieving QVariant type:", e)
-
-        return None, None
-
     def get_child_index(self, name):
-        if name == '$$dereference$$' or name.starts_with('QVariant'):
+        if name == '$$dereference$$' or name.startswith('['):
             return 0
         return -1
 
     def num_children(self):
-        if self.isNull.unsigned == 1:
-            return 0
-
-        tName, vType = self.get_qvariant_type()
-        if not vType:
-            return 0
-
-        return 1
+        return 1 if self.payload else 0
 
+    @output_exceptions
     def get_child_at_index(self, index):
-        if self.isShared.unsigned == 1:
+        if index != 0 or not self.payload:
             return None
-        try:
-            tName, vType = self.get_qvariant_type()
-            if not vType:
-                return None
 
-            return self.data.CreateValueFromAddress('[%s]' % tName, self.data.GetLoadAddress(), vType)
-        except Exception as e:
-            print("Error parsing QVariant:", e)
-        return None
+        tName, vType, address, data = self.payload
+        if address is not None:
+            return self.valobj.CreateValueFromAddress('[%s]' % tName, address, vType)
+        return createValueFromBytes(self.valobj, '[%s]' % tName, data, vType)
+
+    def set_payload(self, tName, vType, data, shared, sharedOffset):
+        '''Locates the value either inside the QVariant, or behind the shared pointer.'''
+        if not vType or not vType.IsValid():
+            return
+
+        if shared:
+            process = self.valobj.GetProcess()
+            sharedPtr = readPointer(process, data.GetLoadAddress())
+            if not sharedPtr:
+                return
+            address = sharedPtr + sharedOffset(process, sharedPtr)
+            self.payload = (tName, vType, address, None)
+            return
+
+        address = data.GetLoadAddress()
+        if address == lldb.LLDB_INVALID_ADDRESS:
+            # The QVariant itself was created from data (e.g. as an element of a QList)
+            error = lldb.SBError()
+            raw = data.GetData().ReadRawData(error, 0, vType.GetByteSize())
+            if error.Success():
+                self.payload = (tName, vType, None, raw)
+            return
+        self.payload = (tName, vType, address, None)
 
+    @output_exceptions
+    @qt_version(6)
     def update(self):
-        try:
-            self.d = self.valobj.GetChildMemberWithName('d')
-            self.isNull = self.d.GetChildMemberWithName('is_null')
-            self.isShared = self.d.GetChildMemberWithName('is_shared')
-            self.packedType = self.d.GetChildMemberWithName('packedType')
-            self.data = self.d.GetChildMemberWithName('data').GetChildMemberWithName('data')
-        except:
-            pass
+        self.payload = None
+        d = self.valobj.GetNonSyntheticValue().GetChildMemberWithName('d')
+        if d.GetChildMemberWithName('is_null').unsigned == 1:
+            return
+
+        target = self.valobj.GetTarget()
+        typeAddr = d.GetChildMemberWithName('packedType').unsigned << 2
+        tName, vType = qmetatypeInterface(target, self.valobj.GetProcess(), typeAddr)
+
+        # PrivateShared { QAtomicInt ref; int offset; }, the value is at "offset" from its start
+        def sharedOffset(process, shared):
+            data = readMemory(process, shared + 4, 4)
+            return struct.unpack(unpackFormat(target, 'i'), data)[0] if data else 0
+
+        self.set_payload(tName, vType, d.GetChildMemberWithName('data'),
+                         d.GetChildMemberWithName('is_shared').unsigned == 1, sharedOffset)
+
+    @output_exceptions
+    @qt_version(5)
+    def update(self):
+        self.payload = None
+        d = self.valobj.GetNonSyntheticValue().GetChildMemberWithName('d')
+        if d.GetChildMemberWithName('is_null').unsigned == 1:
+            return
+
+        # Only built-in types can be resolved without calling QMetaType::typeName() in the inferior
+        target = self.valobj.GetTarget()
+        builtin = builtinMetaType(target, d.GetChildMemberWithName('type').unsigned)
+        if builtin is None:
+            return
+
+        # PrivateShared { void *ptr; QAtomicInt ref; }
+        def sharedOffset(process, shared):
+            return (readPointer(process, shared) or shared) - shared
+
+        self.set_payload(builtin[0], builtin[1], d.GetChildMemberWithName('data'),
+                         d.GetChildMemberWithName('is_shared').unsigned == 1, sharedOffset)
 
 
 @output_exceptions
+@stop_memoized
 def qcoreapplication_summary(valobj, idict, options):
-    d = valobj.GetChildMemberWithName('d_ptr').GetChildMemberWithName('d').Dereference()
-    argc = d.GetChildMemberWithName('argc').Dereference().unsigned
-
-    args = [d.GetValueForExpressionPath('.argv[%i]' % (i)).summary for i in range(0, argc)]
+    target = valobj.GetTarget()
+    process = valobj.GetProcess()
+    argcAddress = fieldPath(target, 'QCoreApplication.d_ptr.d->(QCoreApplicationPrivate)argc').valueAddress(valobj)
+    argvAddress = fieldPath(target, 'QCoreApplication.d_ptr.d->(QCoreApplicationPrivate)argv').valueAddress(valobj)
+    argc = readInt(process, argcAddress) if argcAddress else None
+    argv = readPointer(process, argvAddress) if argvAddress else None
+    if not argc or argc < 0 or not argv:
+        return "{}"
+
+    data = readMemory(process, argv, argc * process.GetAddressByteSize())
+    if data is None:
+        return "{}"
+
+    args = []
+    for arg in struct.unpack(pointerFormat(target, argc), data):
+        error = lldb.SBError()
+        text = process.ReadCStringFromMemory(arg, 4096, error) if arg else None
+        args.append('"%s"' % escapeString(text) if text is not None and error.Success() else 'None')
     return "{%s}" % ' '.join(args)
 
 
-@output_exceptions
+def qstringSize(process):
+    return findType(process.GetTarget(), 'QString').GetByteSize() or byteArraySize(process)
+
+
+def qstringSummaryAt(process, address, limit=None):
+    '''Returns the summary of the QString at "address".'''
+    data = readMemory(process, address, qstringSize(process))
+    if data is None:
+        return None
+    strAddress, size = qstringFromHeader(process, data, 0)
+    return utf16Summary(process, strAddress, size, limit)
+
+
 @qt_version(6)
-def qobject_summary(valobj, idict, options):
-    extraData = valobj.GetNonSyntheticValue().GetValueForExpressionPath('.d_ptr.d').Dereference().GetChildMemberWithName('extraData') # '((QObjectPrivate*).d_ptr.d).extraData.objectName.val')
-    if extraData.unsigned != 0:
-        objName = extraData.Dereference().GetChildMemberWithName('objectName').GetChildMemberWithName('val')
-        if objName.summary != None:
-            return "{%s}" % objName.summary
+def qobjectNamePath(process):
+    return fieldPath(process.GetTarget(), 'QObject.d_ptr.d->(QObjectPrivate)extraData->objectName.val')
 
-    return ""
+
+@qt_version(5)
+def qobjectNamePath(process):
+    return fieldPath(process.GetTarget(), 'QObject.d_ptr.d->(QObjectPrivate)extraData->objectName')
+
+
+def qobjectName(valobj):
+    '''Returns the summary of the objectName of a QObject, or None if it has none.'''
+    process = valobj.GetProcess()
+    address = qobjectNamePath(process).valueAddress(valobj)
+    return qstringSummaryAt(process, address) if address else None
+
+
+def qobjectNameAt(process, address):
+    '''Returns the summary of the objectName of the QObject at "address", or None if it has none.'''
+    address = qobjectNamePath(process).address(process, address)
+    return qstringSummaryAt(process, address) if address else None
+
+
+METAOBJECT_FUNCTION = re.compile(r'^(?P<name>.+?)::metaObject\(\)( const)?$')
+
+
+class MetaObject:
+    '''The class name and the declared properties of a QMetaObject.'''
+
+    def __init__(self, className, properties):
+        self.className = className
+        self.properties = properties
+
+
+@qt_version(6)
+def metaObjectString(process, stringdata, index):
+    # Pairs of (offset, length) into the string block, which starts at stringdata as well
+    header = readMemory(process, stringdata + 8 * index, 8)
+    if header is None:
+        return None
+    offset, length = struct.unpack(unpackFormat(process.GetTarget(), 'II'), header)
+    data = readMemory(process, stringdata + offset, length)
+    return data.decode('utf-8', 'replace') if data is not None else None
 
 
-@output_exceptions
 @qt_version(5)
+def metaObjectString(process, stringdata, index):
+    # An array of QByteArrayData headers
+    ptrSize = process.GetAddressByteSize()
+    address, length = qarrayDataRange(process, stringdata + index * (alignUp(12, ptrSize) + ptrSize))
+    data = readMemory(process, address, max(length, 0))
+    return data.decode('utf-8', 'replace') if data is not None else None
+
+
+def decodeMetaObject(process, address):
+    '''Decodes the class name and the property names of the QMetaObject at "address".'''
+    target = process.GetTarget()
+    # QMetaObject::Data { SuperData superdata; stringdata; const uint *data; ... }
+    header = readMemory(process, address, 3 * process.GetAddressByteSize())
+    if header is None:
+        return None
+    _, stringdata, data = struct.unpack(pointerFormat(target, 3), header)
+
+    # QMetaObjectPrivate { revision, className, classInfoCount, classInfoData, methodCount, methodData,
+    #                      propertyCount, propertyData, ... }
+    ints = readMemory(process, data, 8 * 4)
+    if ints is None:
+        return None
+    revision, className, _, _, _, _, propertyCount, propertyData = struct.unpack(unpackFormat(target, '8I'), ints)
+
+    properties = []
+    # Properties are (name, type, flags), from revision 9 (Qt 6) followed by notifyId and revision
+    stride = 5 if revision >= 9 else 3
+    propertyCount = min(propertyCount, 1024)
+    raw = readMemory(process, data + 4 * propertyData, 4 * stride * propertyCount) if propertyCount else None
+    if raw:
+        for i in range(propertyCount):
+            index = struct.unpack_from(unpackFormat(target, 'I'), raw, 4 * stride * i)[0]
+            properties.append(metaObjectString(process, stringdata, index))
+    return MetaObject(metaObjectString(process, stringdata, className), properties)
+
+
+def metaObjectAt(process, address):
+    '''Returns the decoded QMetaObject at "address". Meta objects never change, so they are decoded once.'''
+    metaObjects = targetState(process.GetTarget()).metaObjects
+    if address not in metaObjects:
+        metaObjects[address] = decodeMetaObject(process, address)
+    return metaObjects[address]
+
+
+def staticMetaObjectAddress(target, className):
+    '''Returns the address of "className::staticMetaObject", from the symbols or the debug info.'''
+    name = className + '::staticMetaObject'
+    symbols = target.FindSymbols(name, lldb.eSymbolTypeData)
+    for i in range(symbols.GetSize()):
+        address = symbols.GetContextAtIndex(i).GetSymbol().GetStartAddress().GetLoadAddress(target)
+        if address != lldb.LLDB_INVALID_ADDRESS:
+            return address
+
+    variables = target.FindGlobalVariables(name, 1)
+    if variables.GetSize():
+        address = variables.GetValueAtIndex(0).GetLoadAddress()
+        if address != lldb.LLDB_INVALID_ADDRESS:
+            return address
+    return None
+
+
+def vtableMetaObject(target, process, vptr):
+    '''Returns the address of the static meta object of the class whose metaObject() is the first entry of
+    the vtable at "vptr", without running code in the inferior.'''
+    function = readPointer(process, vptr)
+    symbol = target.ResolveLoadAddress(function).GetSymbol() if function else None
+    match = METAOBJECT_FUNCTION.match(symbol.GetName() or '') if symbol and symbol.IsValid() else None
+    if not match:
+        return None
+    return staticMetaObjectAddress(target, match.group('name'))
+
+
+def qobjectMetaObject(process, address):
+    '''Returns the decoded meta object of the QObject at "address", or None.'''
+    vptr = readPointer(process, address)
+    if not vptr:
+        return None
+    target = process.GetTarget()
+    vtables = targetState(target).vtableMetaObjects
+    if vptr not in vtables:
+        vtables[vptr] = vtableMetaObject(target, process, vptr)
+    metaObject = vtables[vptr]
+    return metaObjectAt(process, metaObject) if metaObject else None
+
+
+def qobjectClassName(process, address):
+    '''Returns the class name of the QObject at "address" from its meta object, or None.'''
+    metaObject = qobjectMetaObject(process, address)
+    return metaObject.className if metaObject else None
+
+
+def objectAddress(valobj):
+    '''Returns the address of an object, or of the object a pointer points to.'''
+    value = valobj.GetNonSyntheticValue()
+    if value.GetType().IsPointerType():
+        return value.GetValueAsUnsigned() or None
+    address = value.GetLoadAddress()
+    return address if address != lldb.LLDB_INVALID_ADDRESS else None
+
+
+@output_exceptions
+@stop_memoized
 def qobject_summary(valobj, idict, options):
-    extraData = valobj.GetNonSyntheticValue().GetValueForExpressionPath('.d_ptr.d').Dereference().GetChildMemberWithName('extraData')  # '((QObjectPrivate*).d_ptr.d).extraData.objectName.val')
-    if extraData.unsigned != 0:
-        objName = extraData.Dereference().GetChildMemberWithName('objectName')
-        if objName.summary != None:
-            return "{%s}" % objName.summary
+    address = objectAddress(valobj)
+    className = qobjectClassName(valobj.GetProcess(), address) if address else None
+    objName = qobjectName(valobj)
+    return "%s{%s}" % (className or '', objName or '')
 
-    return ""
+
+@output_exceptions
+def qmetaobject_summary(valobj, idict, options):
+    address = objectAddress(valobj)
+    metaObject = metaObjectAt(valobj.GetProcess(), address) if address else None
+    if metaObject is None:
+        return None
+    return "%s {%s}" % (metaObject.className, ', '.join(metaObject.properties))
+
+
+@qt_version(6)
+def pointerListRange(process, address):
+    '''Returns (address of the first element, count) of a QList of pointers at address.'''
+    return arrayDataRange(process, address)
+
+
+@qt_version(5)
+def pointerListRange(process, address):
+    '''Returns (address of the first element, count) of a QList of pointers at address.'''
+    # QListData::Data { QtPrivate::RefCount ref; int alloc, begin, end; void *array[1]; }
+    d = readPointer(process, address)
+    header = readMemory(process, d, 16) if d else None
+    if header is None:
+        return 0, 0
+    _, _, begin, end = struct.unpack(unpackFormat(process.GetTarget(), 'iiii'), header)
+    return d + 16 + begin * process.GetAddressByteSize(), end - begin
+
+
+class QObjectTreeWalker:
+    '''Breadth-first walk over a QObject hierarchy. The children of each object are read as one block of
+    pointers, names and classes are read like in the QObject summary.'''
+
+    def __init__(self, target):
+        self.target = target
+        self.process = target.GetProcess()
+        self.tQObject = findType(target, 'QObject')
+        ptrSize = target.GetAddressByteSize()
+        self.dPtrOffset = fieldOffset(self.tQObject, 'd_ptr')
+        if self.dPtrOffset is None:
+            self.dPtrOffset = ptrSize
+        self.childrenOffset = fieldOffset(findType(target, 'QObjectData'), 'children')
+        if self.childrenOffset is None:
+            # QObjectData { vptr; QObject *q_ptr; QObject *parent; QObjectList children; ... }
+            self.childrenOffset = 3 * ptrSize
+
+    def className(self, address):
+        return qobjectClassName(self.process, address) or '<unknown>'
+
+    def name(self, address):
+        return qobjectNameAt(self.process, address)
+
+    def children(self, address):
+        d = readPointer(self.process, address + self.dPtrOffset)
+        if not d:
+            return []
+        first, count = pointerListRange(self.process, d + self.childrenOffset)
+        count = min(max(count, 0), BULK_READ_LIMIT // self.target.GetAddressByteSize())
+        data = readMemory(self.process, first, count * self.target.GetAddressByteSize()) if count else None
+        if not data:
+            return []
+        return [child for child in struct.unpack(pointerFormat(self.target, count), data) if child]
+
+    def walk(self, root, maxDepth=None):
+        '''Yields (depth, address, parent address) in breadth-first order.'''
+        queue = collections.deque([(0, root, 0)])
+        seen = {root}
+        while queue:
+            depth, address, parent = queue.popleft()
+            yield depth, address, parent
+            if maxDepth is not None and depth >= maxDepth:
+                continue
+            for child in self.children(address):
+                if child not in seen:
+                    seen.add(child)
+                    queue.append((depth + 1, child, address))
 
 
 class QObjectChildProvider:
@@ -278,6 +1610,9 @@ class QObjectChildProvider:
                 self.valobj.GetValueForExpressionPath('.d_ptr.d.parent'),
                 self.valobj.GetValueForExpressionPath('.d_ptr.d.children'),
             ]
+            metaObject = self.metaObject()
+            if metaObject is not None:
+                self.children.append(metaObject)
             extraData = self.valobj.GetValueForExpressionPath(
                 '.d_ptr.d').Dereference().GetValueForExpressionPath('.extraData')
             self.propNames = extraData.GetChildMemberWithName('propertyNames')
@@ -288,19 +1623,36 @@ class QObjectChildProvider:
         except:
             pass
 
+    def metaObject(self):
+        '''The static meta object of the class, as "[metaObject]".'''
+        process = self.valobj.GetProcess()
+        target = self.valobj.GetTarget()
+        address = objectAddress(self.valobj)
+        vptr = readPointer(process, address) if address else None
+        if not vptr or qobjectMetaObject(process, address) is None:
+            return None
+        tMetaObject = findType(target, 'QMetaObject')
+        if not tMetaObject.IsValid():
+            return None
+        return self.valobj.CreateValueFromAddress('[metaObject]', targetState(target).vtableMetaObjects[vptr],
+                                                  tMetaObject)
+
 
 @output_exceptions
+@stop_memoized
 def qfile_summary(valobj: lldb.SBValue, idict, options):
-    target = lldb.debugger.GetSelectedTarget()
-    tFilePrivate = target.FindFirstType("QFilePrivate")
-
-    d = valobj.GetValueForExpressionPath('->d_ptr.d')
-    dFilePrivate = d.CreateChildAtOffset("fileprivate", 0, tFilePrivate)
-    fileName = dFilePrivate.GetValueForExpressionPath('.fileName')
-    fileNameSummary = fileName.summary if fileName.summary else ""
-    openMode = dFilePrivate.GetValueForExpressionPath('.openMode.i')
-    error = dFilePrivate.GetValueForExpressionPath('.error').value
-    openMode = openMode.signed
+    target = valobj.GetTarget()
+    process = valobj.GetProcess()
+
+    fileNameAddress = fieldPath(target, 'QFile.d_ptr.d->(QFilePrivate)fileName').valueAddress(valobj)
+    fileNameSummary = (qstringSummaryAt(process, fileNameAddress) if fileNameAddress else None) or ""
+    openModeAddress = fieldPath(target, 'QFile.d_ptr.d->(QFilePrivate)openMode').valueAddress(valobj)
+    openMode = (readInt(process, openModeAddress) if openModeAddress else None) or 0
+    errorPath = fieldPath(target, 'QFile.d_ptr.d->(QFilePrivate)error')
+    errorAddress = errorPath.valueAddress(valobj)
+    error = readInt(process, errorAddress) if errorAddress else None
+    if error is not None and errorPath.type is not None:
+        error = dict(enumMembers(target, errorPath.type.GetName())).get(error, error)
     oModeFields = ['read', 'write', 'append', 'truncate',
                    'text', 'unbuffered', 'newonly', 'existing']
     lOpenMode = ['closed']
@@ -314,69 +1666,208 @@ def qfile_summary(valobj: lldb.SBValue, idict, options):
     return "{filename=%s, openmode=%s, error=%s}" % (stringFromSummary(fileNameSummary), '|'.join(lOpenMode), error)
 
 
-@output_exceptions
 @qt_version(6)
-def qstring_summary(valobj: lldb.SBValue, idict, options):
+def qstringData(valobj: lldb.SBValue):
+    '''Returns the address of the UTF-16 data and the length of a QString.'''
     d = valobj.GetNonSyntheticValue().GetChildMemberWithName('d')
-    size = d.GetChildMemberWithName('size').unsigned
-    ptr = d.GetChildMemberWithName('ptr')
+    return d.GetChildMemberWithName('ptr').unsigned, d.GetChildMemberWithName('size').unsigned
 
-    if size == 0:
-        return '""'
 
-    s = stringFromSummary(ptr.summary)
-    if s:
-        return '"%s"' % (s)
-    return None
+@qt_version(5)
+def qstringData(valobj: lldb.SBValue):
+    d = valobj.GetNonSyntheticValue().GetChildMemberWithName('d')
+    offset = d.GetChildMemberWithName('offset').signed
+    return d.unsigned + offset, max(d.GetChildMemberWithName('size').signed, 0)
+
+
+@output_exceptions
+@stop_memoized
+def qstring_summary(valobj: lldb.SBValue, idict, options):
+    address, size = qstringData(valobj)
+    limit = 0 if valobj.GetName() == FULL_STRING_CHILD else None
+    return utf16Summary(valobj.GetProcess(), address, size, limit)
+
+
+def qbytearrayData(valobj: lldb.SBValue):
+    '''Returns the address and the size of the bytes of a QByteArray, which is laid out like a QString.'''
+    address, size = qstringData(valobj)
+    return address, max(size, 0)
+
+
+def bytesPreview(data, truncated):
+    '''Shows bytes as a string if they are printable UTF-8, as hex otherwise.'''
+    # A cut off multi-byte sequence at the end does not make the data binary
+    for cut in range(4 if truncated else 1):
+        try:
+            text = data[:len(data) - cut].decode('utf-8')
+        except UnicodeDecodeError:
+            continue
+        if all(c.isprintable() or c in '\n\r\t' for c in text):
+            return '"%s"%s' % (escapeString(text), '...' if truncated else '')
+        break
+    return '[%s%s]' % (' '.join('%02x' % b for b in data), ' ...' if truncated else '')
+
+
+@output_exceptions
+@stop_memoized
+def qbytearray_summary(valobj: lldb.SBValue, idict, options):
+    match = RANGE_NAME.match(valobj.GetName() or '')
+    if match:
+        return 'size=%i' % (int(match.group(2)) - int(match.group(1)) + 1)
+
+    address, size = qbytearrayData(valobj)
+    limit = g_settings['max-bytearray-length']
+    if size == 0 or limit <= 0:
+        return 'size=%i' % size
+
+    count = min(size, limit)
+    data = readMemory(valobj.GetProcess(), address, count)
+    if data is None:
+        return 'size=%i' % size
+    return 'size=%i %s' % (size, bytesPreview(data, count < size))
+
+
+class QByteArrayProvider(PagedChildren):
+    '''The bytes of a QByteArray as char children. They are read in blocks once they are expanded.'''
+
+    # Bytes per read when paging is off
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, valobj, idict):
+        self.valobj = valobj
+        self.address = 0
+        self.length = 0
+        self.charType = None
+        self.cacheKey = None
+        self.blocks = {}
+
+    def hasChildren(self):
+        return True
+
+    def num_children(self):
+        return self.num_paged_children()
+
+    def get_child_index(self, name):
+        return self.paged_child_index(name)
+
+    @output_exceptions
+    def get_child_at_index(self, index):
+        return self.paged_child(index)
+
+    def element_child(self, index):
+        if index < 0 or index >= self.length:
+            return None
+
+        process = self.valobj.GetProcess()
+        key = (process.GetStopID(), self.address, self.length)
+        if key != self.cacheKey:
+            self.cacheKey = key
+            self.blocks = {}
+
+        blockLength = g_settings['page-size'] or self.BLOCK_SIZE
+        blockIndex, offset = divmod(index, blockLength)
+        data = self.blocks.get(blockIndex)
+        if data is None:
+            first = blockIndex * blockLength
+            data = readMemory(process, self.address + first, min(blockLength, self.length - first))
+            self.blocks[blockIndex] = data
+        if data is None:
+            return None
+        return createValueFromBytes(self.valobj, '[%i]' % index, data[offset:offset + 1], self.charType)
+
+    @output_exceptions
+    def update(self):
+        self.address, self.length = qbytearrayData(self.valobj)
+        self.charType = self.valobj.GetTarget().GetBasicType(lldb.eBasicTypeChar)
+        self.page(self.length)
+
+
+# The QString members of QUrlPrivate, in declaration order
+QURL_STRING_FIELDS = ('scheme', 'userName', 'password', 'host', 'path', 'query', 'fragment')
+
+
+@qt_version(6)
+def qstringFromHeader(process, data, offset):
+    '''Returns (address, size) of the characters of a QString whose bytes are at "offset" in "data".'''
+    _, ptr, size = struct.unpack_from(pointerFormat(process.GetTarget(), 3), data, offset)
+    return ptr, size
+
+
+@qt_version(5)
+def qstringFromHeader(process, data, offset):
+    '''Returns (address, size) of the characters of a QString whose bytes are at "offset" in "data".'''
+    d = struct.unpack_from(pointerFormat(process.GetTarget()), data, offset)[0]
+    return qarrayDataRange(process, d)
+
+
+def qurlPrivateLayout(process):
+    '''Returns the offset of the port, the offsets of the QString members and the size of QUrlPrivate.'''
+    target = process.GetTarget()
+    tPrivate = findType(target, 'QUrlPrivate')
+    stringSize = findType(target, 'QString').GetByteSize() or byteArraySize(process)
+    port = fieldOffset(tPrivate, 'port')
+    strings = [fieldOffset(tPrivate, name) for name in QURL_STRING_FIELDS]
+    if port is None or None in strings:
+        # QAtomicInt ref; int port; followed by the strings
+        port = 4
+        strings = [8 + i * stringSize for i in range(len(QURL_STRING_FIELDS))]
+    return port, strings, max(strings) + stringSize
+
+
+class QUrlFields:
+    '''The port and the QString members of a QUrlPrivate, read with a single memory read.'''
+
+    def __init__(self, process, d):
+        self.process = process
+        self.valid = False
+        self.port = -1
+        self.data = None
+        self.offsets = {}
+        self.strings = {}
+
+        self.portOffset, offsets, size = qurlPrivateLayout(process)
+        self.offsets = dict(zip(QURL_STRING_FIELDS, offsets))
+        self.stringSize = size - max(offsets)
+        self.data = readMemory(process, d, size) if d else None
+        if self.data is None:
+            return
+
+        self.valid = True
+        self.port = struct.unpack_from(unpackFormat(process.GetTarget(), 'i'), self.data, self.portOffset)[0]
 
+    def memoBytes(self):
+        return len(self.data or b'') + sum(len(s or '') for s in self.strings.values())
 
-@output_exceptions
-@qt_version(5)
-def qstring_summary(valobj: lldb.SBValue, idict, options):
-    type = valobj.GetType().GetBasicType(lldb.eBasicTypeChar16)
-    d = valobj.GetNonSyntheticValue().GetChildMemberWithName('d')
-    size = d.GetChildMemberWithName('size').unsigned
-    addr = d.unsigned
-    offset = d.GetChildMemberWithName('offset').unsigned
-    ptr = valobj.CreateValueFromAddress('test', addr+offset, type)
+    def string(self, name):
+        '''Returns the content of a string member, or None if it cannot be read.'''
+        if name not in self.strings:
+            address, size = qstringFromHeader(self.process, self.data, self.offsets[name])
+            self.strings[name] = readUtf16String(self.process, address, size, 0)[0] if size > 0 else ''
+        return self.strings[name]
 
-    if size == 0:
-        return '""'
+    def stringData(self, name):
+        offset = self.offsets[name]
+        return self.data[offset:offset + self.stringSize]
 
-    s = stringFromSummary(ptr.AddressOf().summary)
 
-    if s:
-        return '"%s"' % (s)
-    return None
+def qurlFields(valobj):
+    '''Returns the QUrlFields of a QUrl, decoded once per stop for the summary and the provider.'''
+    d = valobj.GetNonSyntheticValue().GetChildMemberWithName('d').unsigned
+    process = valobj.GetProcess()
+    return stopMemoAt(process, d, 'QUrlPrivate', lambda: QUrlFields(process, d))
 
 
 @output_exceptions
+@stop_memoized
 def qurl_summary(valobj: lldb.SBValue, idict, options):
-    target = lldb.debugger.GetSelectedTarget()
-    stringType = target.FindFirstType("QString")
-    stringSize = stringType.GetByteSize()
-    intType = target.FindFirstType("int")
+    fields = qurlFields(valobj)
+    if not fields.valid:
+        return None
 
-    d = valobj.GetNonSyntheticValue().GetChildMemberWithName('d')
+    scheme, user, password, host, path, query, fragment = map(fields.string, QURL_STRING_FIELDS)
+    port = fields.port
 
-    port = d.CreateChildAtOffset('port', 4, intType).signed
-
-    scheme = stringFromSummary(d.CreateChildAtOffset(
-        'scheme',     8+(0*stringSize), stringType).summary)
-    user = stringFromSummary(d.CreateChildAtOffset(
-        'userName',     8+(1*stringSize), stringType).summary)
-    password = stringFromSummary(d.CreateChildAtOffset(
-        'password', 8+(2*stringSize), stringType).summary)
-    host = stringFromSummary(d.CreateChildAtOffset(
-        'host',         8+(3*stringSize), stringType).summary)
-    path = stringFromSummary(d.CreateChildAtOffset(
-        'path',         8+(4*stringSize), stringType).summary)
-    query = stringFromSummary(d.CreateChildAtOffset(
-        'query',       8+(5*stringSize), stringType).summary)
-    fragment = stringFromSummary(d.CreateChildAtOffset(
-        'fragment', 8+(6*stringSize), stringType).summary)
-
-    if any([scheme, host, path, port, user, password]):
+    if any([scheme, host, path, port > 0, user, password]):
         summary = scheme + '://' if scheme else ''
         summary += (user or "") + ':' + (password or "") + '@' if user else ''
         summary += host if host else ''
@@ -393,61 +1884,55 @@ def qurl_summary(valobj: lldb.SBValue, idict, options):
 class QUrlProvider:
     def __init__(self, valobj, _):
         self.valobj = valobj
-        self.urlPrivateType = None
-        self.dUrlPrivate = None
-        self.d = None
-        self.children = []
+        self.fields = None
+        self.names = []
 
     def hasChildren(self):
         return True
 
     def num_children(self):
-        return len(self.children)
+        return len(self.names)
 
     @output_exceptions
     def get_child_at_index(self, index):
-        return self.children[index]
+        if index < 0 or index >= len(self.names):
+            return None
+
+        name = self.names[index]
+        target = self.valobj.GetTarget()
+        if name == 'port':
+            return createValueFromBytes(self.valobj, name, struct.pack(unpackFormat(target, 'i'), self.fields.port),
+                                        target.GetBasicType(lldb.eBasicTypeInt))
+        return createValueFromBytes(self.valobj, name, self.fields.stringData(name), findType(target, 'QString'))
 
     @output_exceptions
     def update(self):
-        target = lldb.debugger.GetSelectedTarget()
-        stringType = target.FindFirstType("QString")
-        stringSize = stringType.GetByteSize()
-        intType = target.FindFirstType("int")
-
-        self.d = self.valobj.GetNonSyntheticValue().GetChildMemberWithName('d')
-
-        self.children = list(filter(lambda child: child.GetError().Success(), [
-            self.d.CreateChildAtOffset(
-                'scheme',   8+(0*stringSize), stringType),
-            self.d.CreateChildAtOffset(
-                'userName', 8+(1*stringSize), stringType),
-            self.d.CreateChildAtOffset(
-                'password', 8+(2*stringSize), stringType),
-            self.d.CreateChildAtOffset(
-                'host',     8+(3*stringSize), stringType),
-            self.d.CreateChildAtOffset('port',     4, intType),
-            self.d.CreateChildAtOffset(
-                'path',     8+(4*stringSize), stringType),
-            self.d.CreateChildAtOffset(
-                'query',    8+(5*stringSize), stringType),
-            self.d.CreateChildAtOffset(
-                'fragment', 8+(6*stringSize), stringType),
-        ]))
+        self.fields = qurlFields(self.valobj)
+        self.names = []
+        if self.fields.valid:
+            self.names = ['scheme', 'userName', 'password', 'host', 'port', 'path', 'query', 'fragment']
 
 
 class QStringProvider:
     def __init__(self, valobj, idict):
         self.valobj = valobj
+        self.truncated = False
 
     def hasChildren(self):
         return True
 
     def num_children(self):
-        return 3
+        return 4 if self.truncated else 3
 
-    @qt_version(6)
     def get_child_at_index(self, index):
+        if index == 3 and self.truncated:
+            # The full string is a copy of this QString, qstring_summary() recognizes it by its name
+            value = self.valobj.GetNonSyntheticValue()
+            return value.CreateValueFromData(FULL_STRING_CHILD, value.GetData(), value.GetType())
+        return self.get_member_at_index(index)
+
+    @qt_version(6)
+    def get_member_at_index(self, index):
         if index == 0:
             return self.valobj.GetChildMemberWithName('d').GetChildMemberWithName('size')
         if index == 1:
@@ -457,7 +1942,7 @@ class QStringProvider:
         return None
 
     @qt_version(5)
-    def get_child_at_index(self, index):
+    def get_member_at_index(self, index):
         if index == 0:
             return self.valobj.GetChildMemberWithName('d').GetChildMemberWithName('size')
 
@@ -473,8 +1958,12 @@ class QStringProvider:
 
         return self.valobj.GetChildMemberWithName('d')
 
+    @output_exceptions
     def update(self):
-        pass
+        limit = g_settings['max-string-length']
+        self.truncated = False
+        if limit > 0 and self.valobj.GetName() != FULL_STRING_CHILD:
+            self.truncated = qstringData(self.valobj)[1] > limit
 
 
 @output_exceptions
@@ -487,147 +1976,963 @@ def envpair_summary(valobj: lldb.SBValue, idict, options):
 
 
 @output_exceptions
+@stop_memoized
 def qtextcursor_summary(valobj: lldb.SBValue, idict, options):
-    target = lldb.debugger.GetSelectedTarget()
-    tPrivate = target.FindFirstType("QTextCursorPrivate")
+    target = valobj.GetTarget()
+    process = valobj.GetProcess()
+    position = fieldPath(target, 'QTextCursor.d.d->(QTextCursorPrivate)position').valueAddress(valobj)
+    anchor = fieldPath(target, 'QTextCursor.d.d->(QTextCursorPrivate)anchor').valueAddress(valobj)
+    if position is None or anchor is None:
+        return None
+
+    return "{pos=%i, anchor=%i}" % (readInt(process, position) or 0, readInt(process, anchor) or 0)
+
+
+class QMapChildProvider(PagedChildren):
+    '''Walks the red-black tree of a QMap directly.
+
+    Qt6 QMap wraps a std::map (libstdc++, libc++ and MSVC layouts are supported, other layouts are left to
+    lldb's std::map provider), Qt5 uses its own QMapData.
+    The in-order node table is built once per stop, after that every child is an O(1) lookup.
+    '''
+
+    def __init__(self, valobj, idict):
+        self.valobj = valobj
+        self.length = 0
+        self.root = 0
+        self.sentinel = 0
+        self.leftOffset = 0
+        self.rightOffset = 0
+        self.nodes = None
+        self.nodesKey = None
+        # The std::map of a Qt6 QMap whose layout is not known, its children come from lldb's provider
+        self.stdMap = None
+
+    def hasChildren(self):
+        return True
+
+    def num_children(self):
+        return self.num_paged_children()
 
-    d = valobj.GetChildMemberWithName('d').GetChildMemberWithName('d')
+    def get_child_index(self, name):
+        return self.paged_child_index(name)
+
+    def nodeTable(self):
+        process = self.valobj.GetProcess()
+        key = (process.GetStopID(), self.root, self.length)
+        if key != self.nodesKey:
+            self.nodesKey = key
+            self.nodes = stopMemo(self.valobj, 'QMap.nodes',
+                                  lambda: walkTree(process, self.root, self.leftOffset, self.rightOffset,
+                                                   self.length, self.sentinel))
+        return self.nodes
+
+    @output_exceptions
+    def get_child_at_index(self, index):
+        return self.paged_child(index)
+
+    def element_child(self, index):
+        if self.stdMap is not None:
+            return self.stdMapChild(index)
+        nodes = self.nodeTable()
+        if index < 0 or index >= len(nodes):
+            return None
+        return self.create_child(nodes[index])
+
+    def keyName(self, address, keyType):
+        key = self.valobj.CreateValueFromAddress('key', address, keyType)
+        return '[%s]' % (key.GetSummary() or key.GetValue())
+
+    def stdMapChild(self, index):
+        pair = self.stdMap.GetChildAtIndex(index, lldb.eDynamicCanRunTarget, True)
+        if not pair.IsValid():
+            return None
+        name = '[%s]' % (pair.GetChildAtIndex(0).GetSummary() or pair.GetChildAtIndex(0).GetValue())
+        return self.valobj.CreateValueFromData(name, pair.GetData(), pair.GetType())
+
+    @qt_version(6)
+    def create_child(self, node):
+        address = node + self.valueOffset
+        name = self.keyName(address, self.keyType)
+        return self.valobj.CreateValueFromAddress(name, address, self.pairType)
+
+    @qt_version(5)
+    def create_child(self, node):
+        name = self.keyName(node + self.keyOffset, self.keyType)
+        return self.valobj.CreateValueFromAddress(name, node + self.valueOffset, self.valueType)
+
+    @output_exceptions
+    @qt_version(6)
+    def update(self):
+        self.length = 0
+        self.stdMap = None
+        self.page(0)
+        d = self.valobj.GetNonSyntheticValue().GetChildMemberWithName('d').GetChildMemberWithName('d')
+        if d.unsigned == 0:
+            return
+
+        m = d.GetChildMemberWithName('m')
+        m.SetPreferSyntheticValue(True)
+        length = m.GetNumChildren()
+        if length == 0:
+            return
+
+        # The synthetic child of the std::map provider tells us the std::pair<const Key, T> type
+        self.pairType = m.GetChildAtIndex(0, lldb.eNoDynamicValues, True).GetType()
+        self.keyType = self.pairType.GetFieldAtIndex(0).GetType()
+
+        process = self.valobj.GetProcess()
+        ptrSize = process.GetAddressByteSize()
+        raw = m.GetNonSyntheticValue()
+        self.sentinel = 0
+
+        if raw.GetChildMemberWithName('_M_t').IsValid():
+            # libstdc++: _Rb_tree_node_base { color; parent; left; right; }, header.parent is the root
+            header = raw.GetValueForExpressionPath('._M_t._M_impl._M_header')
+            self.root = header.GetChildMemberWithName('_M_parent').unsigned
+            self.leftOffset, self.rightOffset, nodeSize = 2 * ptrSize, 3 * ptrSize, 4 * ptrSize
+        elif raw.GetChildMemberWithName('__tree_').IsValid():
+            # libc++: __tree_node_base { left; right; parent; is_black; }, end_node.left is the root
+            tree = raw.GetChildMemberWithName('__tree_')
+            endNode = tree.GetChildMemberWithName('__end_node_')
+            if not endNode.IsValid():
+                endNode = tree.GetChildMemberWithName('__pair1_')
+            self.root = readPointer(process, endNode.GetLoadAddress()) or 0
+            self.leftOffset, self.rightOffset, nodeSize = 0, ptrSize, 3 * ptrSize + 1
+        elif raw.GetChildMemberWithName('_Mypair').IsValid():
+            # MSVC: _Tree_node { left; parent; right; color; isnil; }, leaves point back to the head node
+            head = raw.GetValueForExpressionPath('._Mypair._Myval2._Myhead')
+            self.sentinel = head.unsigned
+            self.root = head.GetChildMemberWithName('_Parent').unsigned
+            self.leftOffset, self.rightOffset, nodeSize = 0, 2 * ptrSize, 3 * ptrSize + 2
+        else:
+            # Unknown standard library, let lldb's std::map provider walk the tree
+            self.stdMap = m
+            self.length = length
+            self.page(length)
+            return
 
-    priv = d.CreateValueFromAddress('private', d.unsigned, tPrivate)
+        self.valueOffset = alignUp(nodeSize, typeAlignment(self.pairType))
+        self.length = length
+        self.page(length)
 
-    pos = priv.GetChildMemberWithName('position').unsigned
-    anchor = priv.GetChildMemberWithName('anchor').unsigned
-    return "{pos=%i, anchor=%i}" % (pos, anchor)
+    @output_exceptions
+    @qt_version(5)
+    def update(self):
+        self.length = 0
+        self.page(0)
+        d = self.valobj.GetNonSyntheticValue().GetChildMemberWithName('d')
+        length = d.GetChildMemberWithName('size').signed
+        if d.unsigned == 0 or length <= 0:
+            return
 
-# QMap is just a wrapper for std::map<>, so we just return the internal map here as the sole child
+        # QMapNodeBase { quintptr p; left; right; }, QMapNode<Key, T> adds "key" and "value"
+        ptrSize = self.valobj.GetProcess().GetAddressByteSize()
+        mapType = self.valobj.GetNonSyntheticValue().GetType().GetCanonicalType()
+        self.keyType = mapType.GetTemplateArgumentType(0)
+        self.valueType = mapType.GetTemplateArgumentType(1)
+        self.keyOffset = alignUp(3 * ptrSize, typeAlignment(self.keyType))
+        self.valueOffset = alignUp(self.keyOffset + self.keyType.GetByteSize(), typeAlignment(self.valueType))
+
+        header = d.GetChildMemberWithName('header')
+        self.root = header.GetChildMemberWithName('left').unsigned
+        self.leftOffset, self.rightOffset = ptrSize, 2 * ptrSize
+        self.sentinel = 0
+        self.length = length
+        self.page(length)
+
+
+QHASH_SPAN_ENTRIES = 128
+QHASH_UNUSED_ENTRY = 0xff
+# Number of Qt6 QHash spans read at once
+QHASH_SPAN_BLOCK = 256
+
+
+def qhash6Nodes(d, nodeSize):
+    '''Yields (address, data) of all nodes of a Qt6 QHashPrivate::Data in iteration order.
+
+    The spans are read in blocks, so every span's offset table comes from one read, and the used part
+    of each span's entry storage is read at once. Unused slots are skipped without creating any SBValue.
+    '''
+    process = d.GetProcess()
+    target = d.GetTarget()
+    ptrSize = target.GetAddressByteSize()
+    fmt = pointerFormat(target)
+
+    spans = d.GetChildMemberWithName('spans')
+    spanType = spans.GetType().GetPointeeType()
+    spanSize = spanType.GetByteSize() or alignUp(QHASH_SPAN_ENTRIES + ptrSize + 2, ptrSize)
+    entriesOffset = fieldOffset(spanType, 'entries')
+    if entriesOffset is None:
+        entriesOffset = QHASH_SPAN_ENTRIES
+
+    numSpans = d.GetChildMemberWithName('numBuckets').unsigned // QHASH_SPAN_ENTRIES
+    remaining = d.GetChildMemberWithName('size').unsigned
+    for first in range(0, numSpans, QHASH_SPAN_BLOCK):
+        count = min(QHASH_SPAN_BLOCK, numSpans - first)
+        block = readMemory(process, spans.unsigned + first * spanSize, count * spanSize)
+        if block is None:
+            return
 
+        for base in range(0, count * spanSize, spanSize):
+            offsets = [o for o in block[base:base + QHASH_SPAN_ENTRIES] if o != QHASH_UNUSED_ENTRY]
+            if not offsets:
+                continue
+
+            entries = struct.unpack_from(fmt, block, base + entriesOffset)[0]
+            storage = readMemory(process, entries, (max(offsets) + 1) * nodeSize)
+            if storage is None:
+                continue
+
+            for o in offsets:
+                yield entries + o * nodeSize, storage[o * nodeSize:(o + 1) * nodeSize]
+                remaining -= 1
+                if remaining <= 0:
+                    return
+
+
+def qhash5Nodes(d):
+    '''Yields (address, data) of all nodes of a Qt5 QHashData by following the bucket chains.'''
+    process = d.GetProcess()
+    target = d.GetTarget()
+    fmt = pointerFormat(target)
+
+    numBuckets = d.GetChildMemberWithName('numBuckets').signed
+    nodeSize = d.GetChildMemberWithName('nodeSize').signed
+    remaining = d.GetChildMemberWithName('size').signed
+    if numBuckets <= 0 or nodeSize <= 0:
+        return
+
+    buckets = readMemory(process, d.GetChildMemberWithName('buckets').unsigned,
+                         numBuckets * target.GetAddressByteSize())
+    if buckets is None:
+        return
+
+    # Every chain ends with a pointer back to the QHashData itself
+    end = d.unsigned
+    for node in struct.unpack(pointerFormat(target, numBuckets), buckets):
+        while node != end and node != 0 and remaining > 0:
+            data = readMemory(process, node, nodeSize)
+            if data is None:
+                break
+            yield node, data
+            remaining -= 1
+            node = struct.unpack_from(fmt, data, 0)[0]
+
+
+class QHashEntries:
+    '''The children of a hash collected so far during a stop, shared by all providers of the hash. They are
+    collected while children are requested and counted against "memo-bytes" as they are added.'''
+
+    def __init__(self, walker):
+        # (name, child data, child type)
+        self.entries = []
+        # name => index of the first entry with that name
+        self.indices = {}
+        self.walker = walker
+        self.bytes = 0
+        # Set by StopMemo once remembered
+        self.memoKey = None
+
+    def memoBytes(self):
+        return self.bytes
+
+    def append(self, name, data, type):
+        self.indices.setdefault(name, len(self.entries))
+        self.entries.append((name, data, type))
+        size = 64 + len(name) + len(data)
+        self.bytes += size
+        if self.memoKey is not None:
+            g_stopMemo.grow(self.memoKey, size)
+
+
+class QHashChildProvider(PagedChildren):
+    '''Children of QHash, QMultiHash and QSet.
+
+    The size is known immediately, nodes are collected lazily (once per stop) up to the requested index.
+    '''
 
-class QMapChildProvider:
     def __init__(self, valobj, idict):
         self.valobj = valobj
+        self.length = 0
+        self.hash = None
+        self.entries = None
+        self.entriesKey = None
 
     def hasChildren(self):
         return True
 
     def num_children(self):
-        return self.m.GetNumChildren()
+        return self.num_paged_children()
+
+    def get_child_index(self, name):
+        index = self.entries.indices.get(name) if self.entries is not None else None
+        if index is not None:
+            return self.element_child_index(index)
+        return self.paged_child_index(name) if self.isSet or RANGE_NAME.match(name) else -1
 
     @output_exceptions
     def get_child_at_index(self, index):
-        syntheticChild = self.m.GetChildAtIndex(
-            index, lldb.eDynamicCanRunTarget, True)
-        key = syntheticChild.GetChildMemberWithName('first').GetSummary()
-        child = self.m.CreateValueFromData(
-            '[%s]' % key, syntheticChild.GetData(), syntheticChild.GetType())
-        return child
+        return self.paged_child(index)
+
+    def element_child(self, index):
+        if index < 0 or index >= self.length:
+            return None
+
+        key = (self.valobj.GetProcess().GetStopID(), self.hash.GetChildMemberWithName('d').unsigned)
+        if key != self.entriesKey:
+            self.entriesKey = key
+            self.entries = stopMemo(self.valobj, 'QHash.entries', lambda: QHashEntries(self.iterEntries()))
+
+        entries = self.entries
+        while len(entries.entries) <= index and entries.walker is not None:
+            try:
+                keyData, data, type = next(entries.walker)
+            except StopIteration:
+                entries.walker = None
+                break
+            name = None
+            if keyData is not None:
+                k = createValueFromBytes(self.valobj, 'key', keyData, self.keyType)
+                keyName = k.GetSummary() or k.GetValue()
+                name = '[%s]' % keyName if keyName is not None else None
+            entries.append(name or '[%i]' % len(entries.entries), data, type)
+
+        if index >= len(entries.entries):
+            return None
+        name, data, type = entries.entries[index]
+        return createValueFromBytes(self.valobj, name, data, type)
+
+    @qt_version(6)
+    def iterEntries(self):
+        '''Yields (key data or None, child data, child type) for every child.'''
+        d = self.hash.GetChildMemberWithName('d')
+        if d.unsigned == 0:
+            return
+
+        # Node<Key, T> { key; value; }, Node<Key, QHashDummyValue> { key; }, MultiNode<Key, T> { key; Chain *value; }
+        nodeType = d.GetType().GetPointeeType().GetTemplateArgumentType(0)
+        keySize = self.keyType.GetByteSize()
+        process = self.valobj.GetProcess()
+        ptrSize = process.GetAddressByteSize()
+        fmt = pointerFormat(self.valobj.GetTarget())
+
+        if self.isMulti:
+            # Chain<T> { T value; Chain *next; }
+            valueSize = self.valueType.GetByteSize()
+            chainOffset = alignUp(keySize, ptrSize)
+            nextOffset = alignUp(valueSize, ptrSize)
+        elif not self.isSet:
+            valueSize = self.valueType.GetByteSize()
+            valueOffset = fieldOffset(nodeType, 'value')
+            if valueOffset is None:
+                valueOffset = alignUp(keySize, typeAlignment(self.valueType))
+
+        for address, data in qhash6Nodes(d, nodeType.GetByteSize()):
+            if self.isSet:
+                yield None, data[:keySize], self.keyType
+            elif self.isMulti:
+                chain = struct.unpack_from(fmt, data, chainOffset)[0]
+                while chain != 0:
+                    link = readMemory(process, chain, nextOffset + ptrSize)
+                    if link is None:
+                        break
+                    yield data[:keySize], link[:valueSize], self.valueType
+                    chain = struct.unpack_from(fmt, link, nextOffset)[0]
+            else:
+                # Like on Qt 5, the child is the value, named after its key
+                yield data[:keySize], data[valueOffset:valueOffset + valueSize], self.valueType
+
+    @qt_version(5)
+    def iterEntries(self):
+        # QHashNode<Key, T> { QHashNode *next; const uint h; const Key key; T value; }
+        d = self.hash.GetChildMemberWithName('d')
+        keySize = self.keyType.GetByteSize()
+        keyOffset = alignUp(self.valobj.GetProcess().GetAddressByteSize() + 4, typeAlignment(self.keyType))
+        if not self.isSet:
+            valueSize = self.valueType.GetByteSize()
+            valueOffset = alignUp(keyOffset + keySize, typeAlignment(self.valueType))
+
+        for address, data in qhash5Nodes(d):
+            keyData = data[keyOffset:keyOffset + keySize]
+            if self.isSet:
+                yield None, keyData, self.keyType
+            else:
+                yield keyData, data[valueOffset:valueOffset + valueSize], self.valueType
+
+    @qt_version(6)
+    def hash_size(self):
+        if self.isMulti:
+            return self.valobj.GetNonSyntheticValue().GetChildMemberWithName('m_size').signed
+        d = self.hash.GetChildMemberWithName('d')
+        return d.GetChildMemberWithName('size').unsigned if d.unsigned != 0 else 0
+
+    @qt_version(5)
+    def hash_size(self):
+        return max(self.hash.GetChildMemberWithName('d').GetChildMemberWithName('size').signed, 0)
 
+    @output_exceptions
     def update(self):
-        try:
-            self.m = self.valobj.GetChildMemberWithName(
-                'd').GetChildMemberWithName('d').GetChildMemberWithName('m')
-            self.m.SetPreferSyntheticValue(True)
-        except:
-            pass
+        value = self.valobj.GetNonSyntheticValue()
+        qHash = value.GetChildMemberWithName('q_hash')
+        self.isSet = qHash.IsValid()
+        self.isMulti = value.GetChildMemberWithName('m_size').IsValid()
+        self.hash = qHash if self.isSet else value
+
+        hashType = self.hash.GetType().GetCanonicalType()
+        self.keyType = hashType.GetTemplateArgumentType(0)
+        self.valueType = hashType.GetTemplateArgumentType(1)
+        self.length = self.hash_size()
+        self.entriesKey = None
+        self.page(self.length)
 
 
 @output_exceptions
+@stop_memoized
 def qstringview_summary(valobj: lldb.SBValue, idict, options):
-    type = valobj.GetType().GetBasicType(lldb.eBasicTypeChar16)
-    data = valobj.GetNonSyntheticValue().GetChildMemberWithName('m_data')
-    size = valobj.GetNonSyntheticValue().GetChildMemberWithName('m_size').signed
+    value = valobj.GetNonSyntheticValue()
+    address = value.GetChildMemberWithName('m_data').unsigned
+    size = max(value.GetChildMemberWithName('m_size').signed, 0)
+    limit = 0 if valobj.GetName() == FULL_STRING_CHILD else None
+    return utf16Summary(valobj.GetProcess(), address, size, limit)
+
+
+class FullStringProvider:
+    '''The members of a string type, plus a "[full]" copy if the summary is cut off at "max-string-length".
+    Subclasses implement length().'''
 
-    size = max(size, 0)
+    def __init__(self, valobj, idict):
+        self.valobj = valobj
+        self.truncated = False
 
-    addr = data.unsigned
-    ptr = valobj.CreateValueFromAddress('test', addr, type)
+    def hasChildren(self):
+        return True
 
-    return '"%s"' % stringFromSummary(ptr.AddressOf().summary)[:size]
+    def num_children(self):
+        return self.valobj.GetNonSyntheticValue().GetNumChildren() + (1 if self.truncated else 0)
 
+    def get_child_index(self, name):
+        value = self.valobj.GetNonSyntheticValue()
+        if name == FULL_STRING_CHILD:
+            return value.GetNumChildren() if self.truncated else -1
+        return value.GetIndexOfChildWithName(name)
+
+    def get_child_at_index(self, index):
+        value = self.valobj.GetNonSyntheticValue()
+        if self.truncated and index == value.GetNumChildren():
+            # A copy of this value, the summary function recognizes it by its name
+            return value.CreateValueFromData(FULL_STRING_CHILD, value.GetData(), value.GetType())
+        return value.GetChildAtIndex(index)
+
+    @output_exceptions
+    def update(self):
+        limit = g_settings['max-string-length']
+        self.truncated = limit > 0 and self.valobj.GetName() != FULL_STRING_CHILD and self.length() > limit
+
+
+class QStringViewProvider(FullStringProvider):
+    def length(self):
+        return self.valobj.GetNonSyntheticValue().GetChildMemberWithName('m_size').signed
+
+
+@qt_version(6)
+def arrayDataRange(process, address):
+    '''Returns (data address, size) of the QArrayDataPointer of a QByteArray / QList at address.'''
+    data = readMemory(process, address, 3 * process.GetAddressByteSize())
+    if data is None:
+        return 0, 0
+    _, ptr, size = struct.unpack(pointerFormat(process.GetTarget(), 3), data)
+    return ptr, size
+
+
+@qt_version(5)
+def arrayDataRange(process, address):
+    '''Returns (data address, size) of the QArrayData of a QByteArray / QVector at address.'''
+    return qarrayDataRange(process, readPointer(process, address))
+
+
+def qarrayDataRange(process, d):
+    '''Returns (data address, size) of a Qt5 QArrayData.'''
+    target = process.GetTarget()
+    ptrSize = process.GetAddressByteSize()
+    # QArrayData { QtPrivate::RefCount ref; int size; uint alloc : 31; uint capacityReserved : 1; qptrdiff offset; }
+    offsetOffset = alignUp(12, ptrSize)
+    header = readMemory(process, d, offsetOffset + ptrSize) if d else None
+    if header is None:
+        return 0, 0
+    size = struct.unpack_from(unpackFormat(target, 'i'), header, 4)[0]
+    offset = struct.unpack_from(unpackFormat(target, 'q' if ptrSize == 8 else 'i'), header, offsetOffset)[0]
+    return d + offset, size
+
+
+@qt_version(6)
+def byteArraySize(process):
+    return 3 * process.GetAddressByteSize()
+
+
+@qt_version(5)
+def byteArraySize(process):
+    return process.GetAddressByteSize()
+
+
+@qt_version(6)
+def byteArraySizeFormat(process):
+    '''Format of QByteArray::size_type (qsizetype).'''
+    return unpackFormat(process.GetTarget(), 'q' if process.GetAddressByteSize() == 8 else 'i')
 
-@output_exceptions
-def qjsonarray_summary(valobj: lldb.SBValue, idict, options):
-    target = lldb.debugger.GetSelectedTarget()
-    tPrivate = target.FindFirstType("QCborContainerPrivate")
-    d = valobj.GetNonSyntheticValue().GetChildMemberWithName(
-        'a').GetChildMemberWithName('d')
-    dc = d.CreateChildAtOffset('[private]', 0, tPrivate)
-    elements = dc.GetChildMemberWithName('elements')
-    elements.SetPreferSyntheticValue(True)
 
-    numElements = elements.GetNumChildren()
-    return "size=%i" % numElements
+@qt_version(5)
+def byteArraySizeFormat(process):
+    '''Format of QByteArray::size_type (int).'''
+    return unpackFormat(process.GetTarget(), 'i')
+
+
+# QCborValue::Type
+CBOR_INTEGER = 0x00
+CBOR_BYTE_ARRAY = 0x40
+CBOR_STRING = 0x60
+CBOR_ARRAY = 0x80
+CBOR_MAP = 0xa0
+CBOR_FALSE = 0x114
+CBOR_TRUE = 0x115
+CBOR_NULL = 0x116
+CBOR_UNDEFINED = 0x117
+CBOR_DOUBLE = 0x202
+
+# QtCbor::Element::ValueFlag
+CBOR_HAS_BYTE_DATA = 0x2
+CBOR_STRING_IS_UTF16 = 0x4
+
+# QtCbor::Element { qint64 value; QCborValue::Type type; ValueFlags flags; }
+CBOR_ELEMENT_SIZE = 16
+
+JSON_CONTAINER_TYPES = ('QJsonArray', 'QJsonObject')
+CBOR_CONTAINER_TYPES = ('QCborArray', 'QCborMap')
+
+
+def cborContainerLayout(process):
+    '''Returns the offsets of usedData, data and elements in QCborContainerPrivate.'''
+    layout = privateOffsets(process.GetTarget(), 'QCborContainerPrivate', ('usedData', 'data', 'elements'))
+    if None not in layout:
+        return layout
+
+    # QSharedData (QAtomicInt ref), QByteArray::size_type usedData, QByteArray data, QList<Element> elements
+    sizeTypeSize = struct.calcsize(byteArraySizeFormat(process))
+    usedData = alignUp(4, sizeTypeSize)
+    data = alignUp(usedData + sizeTypeSize, process.GetAddressByteSize())
+    return usedData, data, data + byteArraySize(process)
+
+
+def cborContainerSize(process, address):
+    '''Returns the number of elements of a QCborContainerPrivate, without reading them.'''
+    if not address:
+        return 0
+    return max(arrayDataRange(process, address + cborContainerLayout(process)[2])[1], 0)
+
+
+class CborContainer:
+    '''A QCborContainerPrivate, with its elements read in one go. The byte data holding strings and
+    keys is read (in one go as well) the first time it is needed.'''
+
+    def __init__(self, process, address):
+        self.process = process
+        self.target = process.GetTarget()
+        self.address = address
+        self.elements = []
+        self._data = None
+        self.dataRange = (0, 0)
+        # ByteData { QByteArray::size_type len; } precedes the bytes of every string and key
+        self.lengthFormat = byteArraySizeFormat(process)
+        if not address:
+            return
+
+        usedOffset, dataOffset, elementsOffset = cborContainerLayout(process)
+        self.dataRange = arrayDataRange(process, address + dataOffset)
+        elementsAddress, count = arrayDataRange(process, address + elementsOffset)
+        count = min(max(count, 0), BULK_READ_LIMIT // CBOR_ELEMENT_SIZE)
+        raw = readMemory(process, elementsAddress, count * CBOR_ELEMENT_SIZE) if count else None
+        if raw:
+            self.elements = list(struct.iter_unpack(unpackFormat(self.target, 'qii'), raw))
+
+    @property
+    def data(self):
+        if self._data is None:
+            address, size = self.dataRange
+            size = min(max(size, 0), BULK_READ_LIMIT)
+            self._data = readMemory(self.process, address, size) or b''
+        return self._data
+
+    def memoBytes(self):
+        # The byte data counts even before it is read
+        return len(self.elements) * CBOR_ELEMENT_SIZE + min(max(self.dataRange[1], 0), BULK_READ_LIMIT)
+
+    def byteData(self, index):
+        '''Returns the bytes stored for the element at index, or None.'''
+        value, type, flags = self.elements[index]
+        if not flags & CBOR_HAS_BYTE_DATA:
+            return None
 
+        lengthSize = struct.calcsize(self.lengthFormat)
+        data = self.data
+        if value < 0 or value + lengthSize > len(data):
+            return None
+        length = struct.unpack_from(self.lengthFormat, data, value)[0]
+        return data[value + lengthSize:value + lengthSize + max(length, 0)]
+
+    def string(self, index):
+        raw = self.byteData(index) or b''
+        if self.elements[index][2] & CBOR_STRING_IS_UTF16:
+            return raw.decode('utf-16-be' if self.target.GetByteOrder() == lldb.eByteOrderBig else 'utf-16-le',
+                              errors='replace')
+        return raw.decode('utf-8', errors='replace')
+
+    def summary(self, index):
+        value, type, flags = self.elements[index]
+        if type == CBOR_STRING:
+            return '"%s"' % escapeString(self.string(index))
+        if type == CBOR_BYTE_ARRAY:
+            return 'size=%i' % len(self.byteData(index) or b'')
+        if type in (CBOR_ARRAY, CBOR_MAP):
+            size = cborContainerSize(self.process, value)
+            return 'size=%i' % (size // 2 if type == CBOR_MAP else size)
+        return cborScalarSummary(self.target, value, type)
+
+    def child(self, valobj, name, index, containerTypes):
+        '''Creates a typed value for the element at index.'''
+        target = self.target
+        value, type, flags = self.elements[index]
+        if type in (CBOR_ARRAY, CBOR_MAP):
+            # QJsonArray, QJsonObject, QCborArray and QCborMap only hold the container pointer
+            cType = findType(target, containerTypes[type == CBOR_MAP])
+            return createValueFromBytes(valobj, name, struct.pack(pointerFormat(target), value), cType)
+        if type in (CBOR_STRING, CBOR_BYTE_ARRAY):
+            raw = (self.string(index).encode('utf-8') if type == CBOR_STRING else self.byteData(index) or b'') + b'\0'
+            cType = target.GetBasicType(lldb.eBasicTypeChar).GetArrayType(len(raw))
+            return createValueFromBytes(valobj, name, raw, cType)
+        if type == CBOR_DOUBLE:
+            return createValueFromBytes(valobj, name, struct.pack(unpackFormat(target, 'q'), value),
+                                        target.GetBasicType(lldb.eBasicTypeDouble))
+        if type in (CBOR_TRUE, CBOR_FALSE):
+            return createValueFromBytes(valobj, name, bytes([type == CBOR_TRUE]),
+                                        target.GetBasicType(lldb.eBasicTypeBool))
+        if type == CBOR_NULL:
+            return createValueFromBytes(valobj, name, bytes(target.GetAddressByteSize()),
+                                        target.GetBasicType(lldb.eBasicTypeNullPtr))
+        return createValueFromBytes(valobj, name, struct.pack(unpackFormat(target, 'q'), value),
+                                    target.GetBasicType(lldb.eBasicTypeLongLong))
+
+
+def cborScalarSummary(target, value, type):
+    if type == CBOR_DOUBLE:
+        return repr(struct.unpack(unpackFormat(target, 'd'), struct.pack(unpackFormat(target, 'q'), value))[0])
+    if type == CBOR_TRUE:
+        return 'true'
+    if type == CBOR_FALSE:
+        return 'false'
+    if type == CBOR_NULL:
+        return 'null'
+    if type == CBOR_UNDEFINED:
+        return 'undefined'
+    if type == CBOR_INTEGER:
+        return str(value)
+    return '<type 0x%x> %i' % (type & 0xffffffff, value)
+
+
+class CborContainerChildProvider(PagedChildren):
+    '''Children of a QCborContainerPrivate based type. Array elements are named [index],
+    map values are named after their key.'''
+
+    member = 'd'
+    isMapType = False
+    containerTypes = CBOR_CONTAINER_TYPES
 
-class JsonArrayChildProvider:
     def __init__(self, valobj, idict):
         self.valobj = valobj
+        self.container = None
+        self.isMap = False
+        self.size = 0
+        self.dc = None
+        self.keyIndex = None
 
     def hasChildren(self):
         return True
 
     def num_children(self):
-        return self.numElements + 1
+        return self.num_paged_children() + (1 if self.dc else 0)
+
+    def get_child_index(self, name):
+        if name == '[private]':
+            return self.num_paged_children() if self.dc else -1
+        if self.isMap:
+            if self.keyIndex is None:
+                # Decoded once per update, IDEs resolve every child by name
+                self.keyIndex = {}
+                for i in range(self.first, self.first + self.count):
+                    self.keyIndex.setdefault(self.keyName(i), i)
+            i = self.keyIndex.get(name)
+            if i is None:
+                return self.paged_child_index(name) if RANGE_NAME.match(name) else -1
+            return self.element_child_index(i)
+        return self.paged_child_index(name)
+
+    def keyName(self, index):
+        return '[%s]' % self.container.summary(2 * index)
 
+    @output_exceptions
     def get_child_at_index(self, index):
-        if index < self.numElements:
-            return self.elements.GetChildAtIndex(index)
-        return self.dc
+        if self.dc and index == self.num_paged_children():
+            return self.dc
+        return self.paged_child(index)
 
+    def element_child(self, index):
+        if index < 0 or index >= self.size:
+            return None
+        if self.isMap:
+            return self.container.child(self.valobj, self.keyName(index), 2 * index + 1, self.containerTypes)
+        return self.container.child(self.valobj, '[%i]' % index, index, self.containerTypes)
+
+    def locate(self, value):
+        '''Returns the address of the QCborContainerPrivate and whether it holds a map.'''
+        return value.GetChildMemberWithName(self.member).GetChildMemberWithName('d').unsigned, self.isMapType
+
+    @output_exceptions
     def update(self):
-        try:
-            target = lldb.debugger.GetSelectedTarget()
-            tPrivate = target.FindFirstType("QCborContainerPrivate")
-            d = self.valobj.GetNonSyntheticValue().GetChildMemberWithName(
-                'a').GetChildMemberWithName('d')
-            self.dc = d.CreateChildAtOffset('[private]', 0, tPrivate)
-            self.elements = self.dc.GetChildMemberWithName('elements')
-            self.elements.SetPreferSyntheticValue(True)
-            # GetValueForExpressionPath('.d.size').unsigned
-            self.numElements = self.elements.GetNumChildren()
-        except:
-            pass
+        self.size = 0
+        self.dc = None
+        self.keyIndex = None
+        self.page(0)
+        address, self.isMap = self.locate(self.valobj.GetNonSyntheticValue())
+        process = self.valobj.GetProcess()
+        self.container = stopMemo(self.valobj, 'CborContainer', lambda: CborContainer(process, address))
+        count = len(self.container.elements)
+        self.size = count // 2 if self.isMap else count
+        self.page(self.size)
+
+        tPrivate = findType(self.valobj.GetTarget(), 'QCborContainerPrivate')
+        if address and tPrivate.IsValid() and not self.is_range():
+            self.dc = self.valobj.CreateValueFromAddress('[private]', address, tPrivate)
+
+
+class JsonArrayChildProvider(CborContainerChildProvider):
+    member = 'a'
+    containerTypes = JSON_CONTAINER_TYPES
+
+
+class JsonObjectChildProvider(CborContainerChildProvider):
+    member = 'o'
+    isMapType = True
+    containerTypes = JSON_CONTAINER_TYPES
+
+
+class CborArrayChildProvider(CborContainerChildProvider):
+    pass
+
+
+class CborMapChildProvider(CborContainerChildProvider):
+    isMapType = True
+
+
+class CborValueChildProvider(CborContainerChildProvider):
+    def locate(self, value):
+        type = value.GetChildMemberWithName('t').signed
+        if type not in (CBOR_ARRAY, CBOR_MAP):
+            return 0, False
+        return value.GetChildMemberWithName('container').unsigned, type == CBOR_MAP
+
+
+class JsonValueChildProvider(CborValueChildProvider):
+    containerTypes = JSON_CONTAINER_TYPES
+
+    def locate(self, value):
+        return CborValueChildProvider.locate(self, value.GetChildMemberWithName('value'))
+
+
+def cborContainerSummary(valobj, member, isMap):
+    match = RANGE_NAME.match(valobj.GetName() or '')
+    if match:
+        return 'size=%i' % (int(match.group(2)) - int(match.group(1)) + 1)
+    address = valobj.GetNonSyntheticValue().GetChildMemberWithName(member).GetChildMemberWithName('d').unsigned
+    size = cborContainerSize(valobj.GetProcess(), address)
+    return 'size=%i' % (size // 2 if isMap else size)
+
+
+def cborValueSummary(process, value):
+    n = value.GetChildMemberWithName('n').signed
+    container = value.GetChildMemberWithName('container').unsigned
+    type = value.GetChildMemberWithName('t').signed
+    if type in (CBOR_ARRAY, CBOR_MAP):
+        size = cborContainerSize(process, container)
+        return 'size=%i' % (size // 2 if type == CBOR_MAP else size)
+    if container and type in (CBOR_STRING, CBOR_BYTE_ARRAY):
+        # The bytes are stored as element n of the container
+        elements = CborContainer(process, container)
+        if 0 <= n < len(elements.elements):
+            return elements.summary(n)
+    return cborScalarSummary(process.GetTarget(), n, type)
+
+
+@output_exceptions
+@stop_memoized
+def qjsonarray_summary(valobj: lldb.SBValue, idict, options):
+    return cborContainerSummary(valobj, 'a', False)
 
 
 @output_exceptions
+@stop_memoized
 def qjsonobject_summary(valobj: lldb.SBValue, idict, options):
-    target = lldb.debugger.GetSelectedTarget()
-    tPrivate = target.FindFirstType("QCborContainerPrivate")
-    d = valobj.GetNonSyntheticValue().GetChildMemberWithName(
-        'o').GetChildMemberWithName('d')
-    dc = d.CreateChildAtOffset('[private]', 0, tPrivate)
-    elements = dc.GetChildMemberWithName('elements')
-    elements.SetPreferSyntheticValue(True)
+    return cborContainerSummary(valobj, 'o', True)
+
+
+@output_exceptions
+@stop_memoized
+def qcborarray_summary(valobj: lldb.SBValue, idict, options):
+    return cborContainerSummary(valobj, 'd', False)
 
-    numElements = elements.GetNumChildren()
-    return "size=%i" % numElements
 
+@output_exceptions
+@stop_memoized
+def qcbormap_summary(valobj: lldb.SBValue, idict, options):
+    return cborContainerSummary(valobj, 'd', True)
+
+
+@output_exceptions
+@stop_memoized
+def qcborvalue_summary(valobj: lldb.SBValue, idict, options):
+    return cborValueSummary(valobj.GetProcess(), valobj.GetNonSyntheticValue())
+
+
+@output_exceptions
+@stop_memoized
+def qjsonvalue_summary(valobj: lldb.SBValue, idict, options):
+    value = valobj.GetNonSyntheticValue().GetChildMemberWithName('value')
+    if not value.IsValid():
+        return None
+    return cborValueSummary(valobj.GetProcess(), value)
+
+
+QT_MODIFIER_MASK = 0xfe000000
+QT_KEY_ESCAPE = 0x01000000
+QT_KEY_SPACE = 0x20
+
+# Modifiers in the order QKeySequence::toString(QKeySequence::PortableText) prints them,
+# with the Qt::KeyboardModifier value used if the enum is not in the debug info
+KEY_SEQUENCE_MODIFIERS = [
+    ('ControlModifier', 'Ctrl', 0x04000000),
+    ('AltModifier', 'Alt', 0x08000000),
+    ('ShiftModifier', 'Shift', 0x02000000),
+    ('MetaModifier', 'Meta', 0x10000000),
+    ('KeypadModifier', 'Num', 0x20000000),
+]
+
+# Portable key names that differ from the Qt::Key enum name without its "Key_" prefix
+PORTABLE_KEY_NAMES = {
+    'Escape': 'Esc',
+    'Insert': 'Ins',
+    'Delete': 'Del',
+    'PageUp': 'PgUp',
+    'PageDown': 'PgDown',
+    'VolumeDown': 'Volume Down',
+    'VolumeMute': 'Volume Mute',
+    'VolumeUp': 'Volume Up',
+    'MediaPlay': 'Media Play',
+    'MediaStop': 'Media Stop',
+    'MediaPrevious': 'Media Previous',
+    'MediaNext': 'Media Next',
+    'MediaRecord': 'Media Record',
+    'MediaPause': 'Media Pause',
+    'MediaTogglePlayPause': 'Toggle Media Play/Pause',
+    'HomePage': 'Home Page',
+}
+
+
+def enumMembers(target, typeName):
+    '''Returns the [(value, name)] members of an enum type, cached per target.'''
+    state = targetState(target)
+    members = state.enums.get(typeName)
+    if members is None:
+        t = findType(target, typeName)
+        members = [(m.signed, m.name) for m in t.GetEnumMembers()] if t else []
+        state.enums[typeName] = members
+    return members
+
+
+def keyText(target, key):
+    '''Renders one key of a QKeySequence like QKeySequence::toString(QKeySequence::PortableText).'''
+    modifiers = {name: value for value, name in enumMembers(target, 'Qt::KeyboardModifier')}
+    parts = []
+    for enumName, text, default in KEY_SEQUENCE_MODIFIERS:
+        mask = modifiers.get(enumName, default)
+        if key & mask == mask:
+            parts.append(text)
+
+    key &= ~QT_MODIFIER_MASK
+    name = ''
+    if key and key < QT_KEY_ESCAPE and key != QT_KEY_SPACE:
+        name = chr(key).upper()
+    elif key:
+        name = next((n for v, n in enumMembers(target, 'Qt::Key') if v == key), None)
+        if name is None and key == QT_KEY_SPACE:
+            name = 'Space'
+        elif name is None:
+            name = chr(key).upper() if key < 0x110000 else hex(key)
+        else:
+            name = name[4:] if name.startswith('Key_') else name
+            name = PORTABLE_KEY_NAMES.get(name, name)
+    parts.append(name)
+    return '+'.join(parts)
+
+
+def qkeysequenceKeys(valobj: lldb.SBValue):
+    '''Reads the key array of QKeySequencePrivate with one memory read.'''
+    target = valobj.GetTarget()
+    d = valobj.GetNonSyntheticValue().GetChildMemberWithName('d').unsigned
+    if d == 0:
+        return []
+
+    # QKeySequencePrivate { QAtomicInt ref; int key[MaxKeyCount]; }
+    offset = fieldOffset(findType(target, 'QKeySequencePrivate'), 'key')
+    data = readMemory(valobj.GetProcess(), d + (4 if offset is None else offset), 4 * 4)
+    if data is None:
+        return []
+
+    keys = struct.unpack(unpackFormat(target, '4i'), data)
+    count = keys.index(0) if 0 in keys else len(keys)
+    return list(keys[:count])
 
 
 class KeySequenceChildProvider:
     def __init__(self, valobj, idict):
         self.valobj = valobj
-        self.numElements = 0
+        self.keys = []
 
     def hasChildren(self):
-        return self.numElements > 0
+        return len(self.keys) > 0
 
     def num_children(self):
-        return self.numElements
+        return len(self.keys)
 
+    @output_exceptions
     def get_child_at_index(self, index):
-        if index < self.numElements:
-            child = self.valobj.EvaluateExpression('operator[](%i)' % index, lldb.SBExpressionOptions(), "[%i]" % index)
-            return child
-        return nil
+        if index < 0 or index >= len(self.keys):
+            return None
 
+        target = self.valobj.GetTarget()
+        type = findType(target, 'QKeyCombination')
+        if not type:
+            type = target.GetBasicType(lldb.eBasicTypeInt)
+        data = struct.pack(unpackFormat(target, 'i'), self.keys[index])
+        return createValueFromBytes(self.valobj, "[%i]" % index, data, type)
+
+    @output_exceptions
     def update(self):
-        self.numElements = self.valobj.EvaluateExpression('count()').GetValueAsSigned()
+        self.keys = qkeysequenceKeys(self.valobj)
+
 
 @output_exceptions
+@stop_memoized
 def qkeysequence_summary(valobj: lldb.SBValue, idict, options):
-    seq = stringFromSummary(
-        valobj.EvaluateExpression('toString(QKeySequence::SequenceFormat::PortableText)')
-            .GetSummary())
+    target = valobj.GetTarget()
+    seq = ', '.join(keyText(target, key) for key in qkeysequenceKeys(valobj))
     if len(seq) == 0:
         return "<empty>"
 
@@ -638,101 +2943,258 @@ def qkeycombination_summary(valobj: lldb.SBValue, idict, options):
     summary = []
 
     c = valobj.GetChildMemberWithName('combination').GetValueAsSigned()
-    key = c & ~0xfe000000
-    mod = c & 0xfe000000
+    key = c & ~QT_MODIFIER_MASK
+    mod = c & QT_MODIFIER_MASK
     
-    target = lldb.debugger.GetSelectedTarget()
+    target = valobj.GetTarget()
 
     if key != 0:
-        keyName = ""
-        keyType = target.FindFirstType('Qt::Key')
-        if keyType:
-            members = keyType.GetEnumMembers()
-            keyName = next(k for k in members if k.signed == key).name
+        keyName = next((n for v, n in enumMembers(target, 'Qt::Key') if v == key), "")
         summary.append("key=%s (%s)" % (keyName, hex(key)))
 
     if mod != 0:
-        modNames = ""
-        modType = target.FindFirstType('Qt::KeyboardModifier')
-        if modType:
-            members = modType.GetEnumMembers()
-            mods = filter((lambda m: m.signed & mod and m.name != "KeyboardModifierMask"), members)
-            modNames = " & ".join(m.name for m in mods)
+        mods = [n for v, n in enumMembers(target, 'Qt::KeyboardModifier') if v & mod and n != "KeyboardModifierMask"]
+        modNames = " & ".join(mods)
         summary.append("mod=%s (%s)" % (modNames, hex(mod)))
 
     return ", ".join(summary)
 
-@output_exceptions
-def qtc_filepath_summary(valobj: lldb.SBValue, idict, options):
-    mData = valobj.GetChildMemberWithName('m_data')
+def qtcFilePathParts(valobj: lldb.SBValue, limit=None):
+    '''Returns (scheme, host, path, truncated) of a Utils::FilePath, or None if it is empty or unreadable.
+    At most "limit" characters of the path are read (default: the "max-string-length" setting, 0 = unlimited).'''
     mPathLen = valobj.GetChildMemberWithName('m_pathLen').unsigned
     mSchemeLen = valobj.GetChildMemberWithName('m_schemeLen').unsigned
     mHostLen = valobj.GetChildMemberWithName('m_hostLen').unsigned
+    if mPathLen + mSchemeLen + mHostLen == 0:
+        return None
 
-    data = stringFromSummary(mData.GetSummary())
-    if not data:
+    # m_data holds the path, followed by the scheme and the host
+    process = valobj.GetProcess()
+    address, size = qstringData(valobj.GetChildMemberWithName('m_data'))
+    path, truncated = readUtf16String(process, address, mPathLen, limit)
+    schemeAndHost = readUtf16String(process, address + 2 * mPathLen, mSchemeLen + mHostLen, 0)[0]
+    if path is None or schemeAndHost is None:
+        return None
+    return schemeAndHost[:mSchemeLen], schemeAndHost[mSchemeLen:], path, truncated
+
+
+@output_exceptions
+@stop_memoized
+def qtc_filepath_summary(valobj: lldb.SBValue, idict, options):
+    parts = qtcFilePathParts(valobj, 0 if valobj.GetName() == FULL_STRING_CHILD else None)
+    if not parts:
         return '<empty>'
-    path = data[:mPathLen]
-    scheme = data[mPathLen:mPathLen+mSchemeLen]
-    host = data[mPathLen + mSchemeLen:mPathLen + mSchemeLen+mHostLen]
+    scheme, host, path = map(escapeString, parts[:3])
+    more = '...' if parts[3] else ''
+
+    if scheme and host:
+        return f'"{scheme}://{host}{path}"{more}'
+    return f'"{path}"{more}'
 
-    if mSchemeLen > 0 and mHostLen > 0:
-        return f'"{scheme}://{host}{path}"'
-    return f'"{path}"'
+
+class QtcFilePathProvider(FullStringProvider):
+    def length(self):
+        return self.valobj.GetNonSyntheticValue().GetChildMemberWithName('m_pathLen').unsigned
 
 
 @output_exceptions
+@stop_memoized
 def qtc_commandline_summary(valobj: lldb.SBValue, idict, options):
     mArguments = valobj.GetChildMemberWithName('m_arguments')
     mExecutable = valobj.GetChildMemberWithName('m_executable')
-    fName = stringFromSummary(
-        mExecutable.EvaluateExpression('fileName()').GetSummary())
 
-    return ".../%s %s" % (fName, stringFromSummary(mArguments.GetSummary()))
+    # Same as FilePath::fileName()
+    parts = qtcFilePathParts(mExecutable, 0)
+    fName = parts[2].rsplit('/', 1)[-1] if parts else ''
+
+    address, size = qstringData(mArguments)
+    arguments, truncated = readUtf16String(valobj.GetProcess(), address, size)
+    arguments = escapeString(arguments or '') + ('...' if truncated else '')
+
+    return ".../%s %s" % (escapeString(fName), arguments)
+
+
+class QtcIdTable:
+    '''Maps Utils::Id values to their names using Qt Creator's global "stringFromId" hash.
+
+    Names never change once an id is registered, so they are remembered for the lifetime of the target's
+    modules. The hash itself is only read again (once per stop) when an unknown id shows up.
+    '''
+
+    def __init__(self, target):
+        self.target = target
+        self.names = {}
+        self.entries = {}
+        self.entriesStopId = None
+
+    def readEntries(self, process):
+        '''Returns {id: (address, length)} of the name of every registered id.'''
+        entries = {}
+        stringFromId = self.target.FindFirstGlobalVariable('Utils::stringFromId')
+        if not stringFromId.IsValid():
+            stringFromId = self.target.FindFirstGlobalVariable('stringFromId')
+        d = stringFromId.GetChildMemberWithName('d')
+        if not stringFromId.IsValid() or d.unsigned == 0:
+            return entries
+
+        # QHash<quintptr, StringHolder> with StringHolder { int n; const char *str; quintptr h; },
+        # or QHash<quintptr, QByteArray> in newer versions
+        nodeType = d.GetType().GetPointeeType().GetTemplateArgumentType(0)
+        valueField = next((nodeType.GetFieldAtIndex(i) for i in range(nodeType.GetNumberOfFields())
+                           if nodeType.GetFieldAtIndex(i).GetName() == 'value'), None)
+        if valueField is None:
+            return entries
+
+        valueOffset = valueField.GetOffsetInBytes()
+        valueType = valueField.GetType()
+        ptrSize = self.target.GetAddressByteSize()
+        if valueType.GetName().startswith('QByteArray'):
+            strOffset, lengthOffset, lengthFormat = ptrSize, 2 * ptrSize, pointerFormat(self.target)
+        else:
+            strOffset = fieldOffset(valueType, 'str')
+            lengthOffset = fieldOffset(valueType, 'n')
+            if strOffset is None or lengthOffset is None:
+                strOffset, lengthOffset = ptrSize, 0
+            lengthFormat = unpackFormat(self.target, 'i')
+
+        fmt = pointerFormat(self.target)
+        for address, data in qhash6Nodes(d, nodeType.GetByteSize()):
+            id = struct.unpack_from(fmt, data, 0)[0]
+            strAddress = struct.unpack_from(fmt, data, valueOffset + strOffset)[0]
+            length = struct.unpack_from(lengthFormat, data, valueOffset + lengthOffset)[0]
+            entries[id] = (strAddress, length)
+        return entries
+
+    def name(self, process, id):
+        name = self.names.get(id)
+        if name is not None:
+            return name
+
+        stopId = process.GetStopID()
+        if id not in self.entries and stopId != self.entriesStopId:
+            self.entriesStopId = stopId
+            self.entries = self.readEntries(process)
+
+        entry = self.entries.get(id)
+        if entry is None:
+            return None
+        data = readMemory(process, entry[0], entry[1])
+        if data is None:
+            return None
+        name = data.decode('utf-8', errors='replace')
+        self.names[id] = name
+        return name
 
 
 @output_exceptions
+@stop_memoized
 def qtc_id_summary(valobj: lldb.SBValue, idict, options):
     mId = valobj.GetChildMemberWithName('m_id').GetValueAsUnsigned()
-    return '%s (%i)' % (valobj.EvaluateExpression('toString()').GetSummary(), mId)
+    state = targetState(valobj.GetTarget())
+    if state.qtcIds is None:
+        state.qtcIds = QtcIdTable(valobj.GetTarget())
+
+    name = state.qtcIds.name(valobj.GetProcess(), mId)
+    return '%s (%i)' % ('"%s"' % escapeString(name) if name is not None else '<unknown>', mId)
+
+
+# QDateTimePrivate::StatusFlag
+QDATETIME_SHORT_DATA = 0x01
+QDATETIME_VALID_DATE = 0x02
+QDATETIME_VALID_DATETIME = 0x08
+QDATETIME_TIMESPEC_MASK = 0x30
+QDATETIME_TIMESPEC_SHIFT = 4
+
+# Qt::TimeSpec
+QT_UTC = 1
+QT_OFFSET_FROM_UTC = 2
+QT_TIME_ZONE = 3
+
+# QDateTimePrivate field offsets used when there is no debug info for it, by Qt major version
+QDATETIME_PRIVATE_LAYOUTS = {
+    5: {'m_msecs': 0, 'm_status': 8, 'm_offsetFromUtc': 12},
+    6: {'m_status': 4, 'm_msecs': 8, 'm_offsetFromUtc': 16},
+}
+
+
+def qdatetimePrivateLayout(target):
+    tPrivate = findType(target, 'QDateTimePrivate')
+    layout = {name: fieldOffset(tPrivate, name) for name in ('m_msecs', 'm_status', 'm_offsetFromUtc')}
+    if None in layout.values():
+        layout = QDATETIME_PRIVATE_LAYOUTS.get(targetState(target).getQtVersion()[0])
+    return layout
+
+
+def decodeQDateTime(valobj: lldb.SBValue):
+    '''Returns (msecs, status, offsetFromUtc) of a QDateTime, decoded from memory.
+
+    msecs is the local (wall clock) time of the date time's time spec. QDateTime either packs
+    status and msecs into one "short data" word (lowest bit set), or points to a QDateTimePrivate.
+    '''
+    target = valobj.GetTarget()
+    ptrSize = target.GetAddressByteSize()
+    error = lldb.SBError()
+    data = valobj.GetNonSyntheticValue().GetData()
+    word = data.GetUnsignedInt64(error, 0) if ptrSize == 8 else data.GetUnsignedInt32(error, 0)
+    if error.Fail():
+        return None
 
-@output_exceptions
-def qdatetime_summary(valobj: lldb.SBValue, idict, options):
-    #mId = valobj.GetChildMemberWithName('m_id').GetValueAsUnsigned()
-    return '%s' % (valobj.EvaluateExpression('toString(Qt::DateFormat::TextDate)').GetSummary())
+    if word & QDATETIME_SHORT_DATA:
+        msecs = word >> 8
+        if msecs & (1 << (ptrSize * 8 - 9)):
+            msecs -= 1 << (ptrSize * 8 - 8)
+        return msecs, word & 0xff, None
 
+    layout = qdatetimePrivateLayout(target)
+    if word == 0 or layout is None:
+        return None
 
-class JsonObjectChildProvider:
-    def __init__(self, valobj, idict):
-        self.valobj = valobj
+    priv = readMemory(valobj.GetProcess(), word, max(layout.values()) + 8)
+    if priv is None:
+        return None
+    msecs = struct.unpack_from(unpackFormat(target, 'q'), priv, layout['m_msecs'])[0]
+    status = struct.unpack_from(unpackFormat(target, 'I'), priv, layout['m_status'])[0]
+    offset = struct.unpack_from(unpackFormat(target, 'i'), priv, layout['m_offsetFromUtc'])[0]
+    return msecs, status, offset
 
-    def hasChildren(self):
-        return True
 
-    def num_children(self):
-        return self.numElements + 1
+def formatQDateTime(msecs, status, offsetFromUtc):
+    '''Formats decoded QDateTime data as ISO-8601.'''
+    if not status & (QDATETIME_VALID_DATE | QDATETIME_VALID_DATETIME):
+        return '<invalid>'
 
-    def get_child_at_index(self, index):
-        if index < self.numElements:
-            return self.elements.GetChildAtIndex(index)
-        return self.dc
+    try:
+        dt = datetime.datetime(1970, 1, 1) + datetime.timedelta(milliseconds=msecs)
+    except OverflowError:
+        return '<msecs=%i>' % msecs
 
-    def update(self):
-        try:
-            target = lldb.debugger.GetSelectedTarget()
-            tPrivate = target.FindFirstType("QCborContainerPrivate")
-            d = self.valobj.GetNonSyntheticValue().GetChildMemberWithName(
-                'o').GetChildMemberWithName('d')
-            self.dc = d.CreateChildAtOffset('[private]', 0, tPrivate)
-            self.elements = self.dc.GetChildMemberWithName('elements')
-            self.elements.SetPreferSyntheticValue(True)
-            # GetValueForExpressionPath('.d.size').unsigned
-            self.numElements = self.elements.GetNumChildren()
-        except:
-            pass
+    result = '%04d-%02d-%02dT%02d:%02d:%02d.%03d' % (dt.year, dt.month, dt.day, dt.hour, dt.minute,
+                                                     dt.second, dt.microsecond // 1000)
+
+    spec = (status & QDATETIME_TIMESPEC_MASK) >> QDATETIME_TIMESPEC_SHIFT
+    if spec == QT_UTC:
+        result += 'Z'
+    elif spec in (QT_OFFSET_FROM_UTC, QT_TIME_ZONE) and offsetFromUtc is not None:
+        sign = '-' if offsetFromUtc < 0 else '+'
+        hours, minutes = divmod(abs(offsetFromUtc) // 60, 60)
+        result += '%s%02d:%02d' % (sign, hours, minutes)
+    return '"%s"' % result
 
 
 @output_exceptions
+@stop_memoized
+def qdatetime_summary(valobj: lldb.SBValue, idict, options):
+    decoded = decodeQDateTime(valobj)
+    if decoded is not None:
+        return formatQDateTime(*decoded)
+
+    if g_settings['datetime-expression-fallback']:
+        value = evaluateExpression('qdatetime_summary', valobj, 'toString(Qt::DateFormat::TextDate)')
+        return value.GetSummary() if value is not None else NO_JIT_PLACEHOLDER
+    return None
+
+
+@report_exceptions
 def registerTypeSummary(category, typeName, functionOrString, typeNameIsRegularExpression=False, options=None):
     '''Register a summary provider for a type.'''
     typeSpecifier = lldb.SBTypeNameSpecifier(
@@ -750,7 +3212,7 @@ def registerTypeSummary(category, typeName, functionOrString, typeNameIsRegularE
     return summary
 
 
-@output_exceptions
+@report_exceptions
 def registerTypeSynthetic(category, typeName, cls, typeNameIsRegularExpression=False, options=None):
     '''Register a synthetic provider for a type.'''
     typeSpecifier = lldb.SBTypeNameSpecifier(
@@ -794,20 +3256,157 @@ def vfptr(debugger, command, result, internal_dict):
     except Exception as e:
         result.SetError(str(e))
 
-@output_exceptions
-def __lldb_init_module(debugger, dict):
-    print("Loading MAD extensions...")
+def qobjecttree(debugger, command, result, internal_dict):
+    """Prints the QObject hierarchy below an object breadth-first:
+    qobjecttree <expression> [--max-depth <n>] [--name <regex>] [--class <regex>]"""
+    try:
+        args = shlex.split(command)
+        usage = "qobjecttree <expression> [--max-depth <n>] [--name <regex>] [--class <regex>]"
+        options = {'--max-depth': None, '--name': None, '--class': None}
+        expression = None
+        while args:
+            arg = args.pop(0)
+            if arg in options and args:
+                options[arg] = args.pop(0)
+            elif expression is None and not arg.startswith('--'):
+                expression = arg
+            else:
+                result.SetError(usage)
+                return
+        if expression is None:
+            result.SetError(usage)
+            return
+
+        target = debugger.GetSelectedTarget()
+        frame = target.GetProcess().GetSelectedThread().GetSelectedFrame()
+        value = frame.EvaluateExpression(expression)
+        if not value.IsValid() or value.GetError().Fail():
+            result.SetError("Invalid expression")
+            return
+        root = value.unsigned if value.TypeIsPointerType() else value.GetLoadAddress()
+
+        maxDepth = int(options['--max-depth']) if options['--max-depth'] is not None else None
+        namePattern = re.compile(options['--name']) if options['--name'] else None
+        classPattern = re.compile(options['--class']) if options['--class'] else None
+
+        # Write each line to the debugger's output as it is found, instead of collecting the whole tree in
+        # the result
+        output = debugger.GetOutputFile()
+
+        def write(line):
+            output.Write((line + '\n').encode())
+
+        walker = QObjectTreeWalker(target)
+        count = 0
+        for depth, address, parent in walker.walk(root, maxDepth):
+            count += 1
+            className = walker.className(address)
+            if classPattern and not classPattern.search(className):
+                continue
+            name = walker.name(address)
+            if namePattern and not namePattern.search(stringFromSummary(name) if name else ''):
+                continue
+            write("%i: %s%s 0x%x (parent 0x%x)" % (depth, className, '{%s}' % name if name else '', address, parent))
+        write("%i objects" % count)
+        output.Flush()
+
+    except Exception as e:
+        result.SetError(str(e))
+
+
+def parseSetting(name, value):
+    default = g_settings[name]
+    if isinstance(default, bool):
+        if value.lower() in ('1', 'on', 'true', 'yes'):
+            return True
+        if value.lower() in ('0', 'off', 'false', 'no'):
+            return False
+        raise ValueError('"%s" expects a boolean value' % name)
+    return type(default)(value)
+
+
+def mad_show(debugger, args, result):
+    for name, value in sorted(g_settings.items()):
+        result.AppendMessage("%s = %s" % (name, value))
+
+
+def mad_set(debugger, args, result):
+    if len(args) != 2:
+        result.SetError("mad set <setting> <value>")
+        return
+    if args[0] not in g_settings:
+        result.SetError('Unknown setting "%s", available: %s' % (args[0], ', '.join(sorted(g_settings))))
+        return
+    g_settings[args[0]] = parseSetting(args[0], args[1])
+    # Remembered results may depend on the old value
+    g_stopMemo.clear()
+    if args[0] == 'lazy-categories':
+        updateCategories(debugger)
+
+
+def mad_expr_stats(debugger, args, result):
+    if args == ['--reset']:
+        g_expressionStats.clear()
+        return
+    if args:
+        result.SetError("mad expr-stats [--reset]")
+        return
+    if not g_expressionStats:
+        result.AppendMessage("No expressions were evaluated by formatters")
+        return
+    result.AppendMessage("%-30s %8s %10s %8s" % ('formatter', 'count', 'seconds', 'refused'))
+    for formatter, stats in sorted(g_expressionStats.items(), key=lambda item: -item[1].seconds):
+        result.AppendMessage("%-30s %8i %10.3f %8i" % (formatter, stats.count, stats.seconds, stats.refused))
+
+
+def mad_stats(debugger, args, result):
+    if any(arg not in ('--reset', '--json') for arg in args):
+        result.SetError("mad stats [--reset] [--json]")
+        return
+
+    stats = sorted(g_formatterStats.items(), key=lambda item: -item[1].seconds)
+    if '--json' in args:
+        result.AppendMessage(json.dumps({name: s.asDict() for name, s in stats}, indent=2))
+    elif '--reset' not in args:
+        result.AppendMessage("%-45s %8s %10s %9s %12s %8s" % ('formatter', 'calls', 'total ms', 'p99 ms', 'bytes read', 'reads'))
+        for name, s in stats:
+            if s.calls:
+                result.AppendMessage("%-45s %8i %10.2f %9.3f %12i %8i" % (name, s.calls, s.seconds * 1000,
+                                                                           s.p99() * 1000, s.bytesRead, s.reads))
+
+    if '--reset' in args:
+        g_formatterStats.clear()
+
+
+MAD_SUBCOMMANDS = {
+    'show': mad_show,
+    'set': mad_set,
+    'expr-stats': mad_expr_stats,
+    'stats': mad_stats,
+}
+
+
+def mad(debugger, command, result, internal_dict):
+    """Settings of the lldbmad formatters: mad show | mad set <setting> <value> | mad expr-stats [--reset] | mad stats [--reset] [--json]"""
+    try:
+        args = shlex.split(command)
+        if len(args) < 1 or args[0] not in MAD_SUBCOMMANDS:
+            result.SetError("mad <%s> ..." % '|'.join(MAD_SUBCOMMANDS))
+            return
 
-    ################################################################################
-    # Qt Extensions
+        MAD_SUBCOMMANDS[args[0]](debugger, args[1:], result)
+
+    except Exception as e:
+        result.SetError(str(e))
 
-    madCategory = debugger.CreateCategory('MAD')
-    madCategory.SetEnabled(True)
 
+def registerCoreFormatters(madCategory):
+    '''Formatters for types of QtCore, except JSON / CBOR.'''
     registerTypeSummary(madCategory, "QString", qstring_summary)
     registerTypeSynthetic(madCategory, "QString", QStringProvider)
 
     registerTypeSummary(madCategory, "QObject", qobject_summary)
+    registerTypeSummary(madCategory, "QMetaObject", qmetaobject_summary)
     registerTypeSynthetic(madCategory, "QObject", QObjectChildProvider)
 
     registerTypeSummary(madCategory, "QFile", qfile_summary)
@@ -819,15 +3418,15 @@ def __lldb_init_module(debugger, dict):
     registerTypeSynthetic(madCategory, "QUrl", QUrlProvider)
 
     registerTypeSummary(madCategory, "QStringView", qstringview_summary)
+    registerTypeSynthetic(madCategory, "QStringView", QStringViewProvider)
 
-    registerTypeSummary(madCategory, "QByteArray", "size=${var.d.size}")
-
-    registerTypeSummary(madCategory, "QTextCursor", qtextcursor_summary)
+    registerTypeSummary(madCategory, "QByteArray", qbytearray_summary)
+    registerTypeSynthetic(madCategory, "QByteArray", QByteArrayProvider)
 
     registerTypeSummary(madCategory, "QDateTime", qdatetime_summary)
 
     registerTypeSummary(madCategory, "^QList<.+>$",
-                        "size=${svar%#}", True, lldb.eTypeOptionCascade)
+                        paged_size_summary, True, lldb.eTypeOptionCascade)
     registerTypeSynthetic(madCategory, "^QList<.+>$",
                           QListChildProvider, True, lldb.eTypeOptionCascade)
 
@@ -839,32 +3438,60 @@ def __lldb_init_module(debugger, dict):
                         qcoreapplication_summary, True)
 
     registerTypeSummary(madCategory, "^QMap<.+>$",
-                        "${var.d.d.m}", True, lldb.eTypeOptionCascade)
+                        paged_size_summary, True, lldb.eTypeOptionCascade)
     registerTypeSynthetic(madCategory, "^QMap<.+>$",
                           QMapChildProvider, True, lldb.eTypeOptionCascade)
 
+    registerTypeSummary(madCategory, "^Q(Multi)?Hash<.+>$",
+                        paged_size_summary, True, lldb.eTypeOptionCascade)
+    registerTypeSynthetic(madCategory, "^Q(Multi)?Hash<.+>$",
+                          QHashChildProvider, True, lldb.eTypeOptionCascade)
+
+    registerTypeSummary(madCategory, "^QSet<.+>$",
+                        paged_size_summary, True, lldb.eTypeOptionCascade)
+    registerTypeSynthetic(madCategory, "^QSet<.+>$",
+                          QHashChildProvider, True, lldb.eTypeOptionCascade)
+
+    registerTypeSummary(madCategory, "QKeyCombination", qkeycombination_summary)
+
+
+def registerJsonFormatters(madCategory):
+    '''Formatters for the JSON and CBOR types of QtCore.'''
     registerTypeSummary(madCategory, "QJsonArray", qjsonarray_summary)
     registerTypeSynthetic(madCategory, "QJsonArray", JsonArrayChildProvider)
 
     registerTypeSummary(madCategory, "QJsonObject", qjsonobject_summary)
     registerTypeSynthetic(madCategory, "QJsonObject", JsonObjectChildProvider)
 
-    registerTypeSummary(madCategory, "QKeyCombination", qkeycombination_summary)
+    registerTypeSummary(madCategory, "QJsonValue", qjsonvalue_summary)
+    registerTypeSynthetic(madCategory, "QJsonValue", JsonValueChildProvider)
+
+    registerTypeSummary(madCategory, "QCborArray", qcborarray_summary)
+    registerTypeSynthetic(madCategory, "QCborArray", CborArrayChildProvider)
+
+    registerTypeSummary(madCategory, "QCborMap", qcbormap_summary)
+    registerTypeSynthetic(madCategory, "QCborMap", CborMapChildProvider)
+
+    registerTypeSummary(madCategory, "QCborValue", qcborvalue_summary)
+    registerTypeSynthetic(madCategory, "QCborValue", CborValueChildProvider)
+
+
+def registerGuiFormatters(madCategory):
+    '''Formatters for types of QtGui.'''
+    registerTypeSummary(madCategory, "QTextCursor", qtextcursor_summary)
 
     registerTypeSummary(madCategory, "QKeySequence", qkeysequence_summary)
     registerTypeSynthetic(madCategory, "QKeySequence", KeySequenceChildProvider)
 
-    ################################################################################
-    # Qt Creator extensions
-
-    qtcCategory = debugger.CreateCategory('QTC')
-    qtcCategory.SetEnabled(True)
 
+def registerQtcFormatters(qtcCategory):
+    '''Formatters for types of the Qt Creator Utils library.'''
     registerTypeSummary(
         qtcCategory, "^std::__[[:alnum:]]+::pair<const Utils::DictKey, std::__[[:alnum:]]+::pair<QString, bool> >", envpair_summary, True)
 
     registerTypeSummary(qtcCategory, "Utils::FilePath", qtc_filepath_summary)
-    registerTypeSummary(qtcCategory, "Utils::FilePaths", "size=${svar%#}")
+    registerTypeSynthetic(qtcCategory, "Utils::FilePath", QtcFilePathProvider)
+    registerTypeSummary(qtcCategory, "Utils::FilePaths", paged_size_summary)
     registerTypeSynthetic(qtcCategory, "Utils::FilePaths", QListChildProvider)
 
     registerTypeSummary(qtcCategory, "Utils::Id", qtc_id_summary)
@@ -873,4 +3500,114 @@ def __lldb_init_module(debugger, dict):
                         qtc_commandline_summary)
 
 
+# Types with a remembered summary (see stop_memoized()), which PrefetchStopHook computes ahead of time
+PREFETCH_TYPE = re.compile(r'^(const )?(QString|QByteArray|QUrl|QObject)( ?[*&])?$')
+
+
+class PrefetchStopHook:
+    '''Scripted stop hook computing the summaries of the Qt arguments and locals of the selected frame
+    right after a stop, before the IDE asks for them. The results are remembered for the stop (see stopMemo()).
+    It runs on lldb's thread like any other formatter and stops once "prefetch-budget" is used up.
+
+        target stop-hook add -P lldbmad.PrefetchStopHook
+    '''
+
+    def __init__(self, target, extra_args, internal_dict):
+        self.target = target
+
+    def handle_stop(self, exe_ctx, stream):
+        frame = exe_ctx.GetFrame()
+        if frame.IsValid() and g_settings['memo-size'] > 0:
+            self.prefetch(frame, time.perf_counter() + g_settings['prefetch-budget'] / 1000)
+        # Do not change whether the process stops
+        return True
+
+    def prefetch(self, frame, deadline):
+        '''Computes the summaries of the variables of "frame" that match PREFETCH_TYPE until "deadline".
+        Returns the number of summaries computed.'''
+        count = 0
+        variables = frame.GetVariables(True, True, False, True)
+        for i in range(variables.GetSize()):
+            if time.perf_counter() > deadline:
+                break
+            value = variables.GetValueAtIndex(i)
+            if PREFETCH_TYPE.match(value.GetTypeName() or ''):
+                value.GetSummary()
+                count += 1
+        return count
+
+
+QTC_UTILS_MODULE = re.compile(r'^(lib)?Utils(d)?(\.|$)')
+
+# Formatter categories, what enables them and the function registering their formatters. Qt is detected by a
+# QtCore / QtGui symbol, which is found in the Qt libraries as well as in statically linked executables.
+# Qt Creator's Utils library is detected by its file name. The JSON / CBOR classes live in QtCore as well.
+FORMATTER_CATEGORIES = [
+    ('MAD', 'qt_version_tag', registerCoreFormatters),
+    ('MAD-Json', 'qt_version_tag', registerJsonFormatters),
+    ('MAD-Gui', 'QGuiApplication::staticMetaObject', registerGuiFormatters),
+    ('QTC', QTC_UTILS_MODULE, registerQtcFormatters),
+]
+
+g_categories = {}
+
+
+def loadedModuleNames(debugger):
+    for i in range(debugger.GetNumTargets()):
+        target = debugger.GetTargetAtIndex(i)
+        for j in range(target.GetNumModules()):
+            yield target.GetModuleAtIndex(j).GetFileSpec().GetFilename() or ''
+
+
+def hasSymbol(debugger, name):
+    '''Whether any target has a symbol of that name.'''
+    for i in range(debugger.GetNumTargets()):
+        if debugger.GetTargetAtIndex(i).FindSymbols(name).GetSize():
+            return True
+    return False
+
+
+def updateCategories(debugger):
+    '''Enables the categories whose library is loaded into any target, and disables the others.
+    A category is only created and filled the first time it is needed.
+    With "lazy-categories" turned off (the default) all categories are enabled.
+
+    Lazy categories are updated when lldbmad is imported and from the module events of the targets, which
+    are handled before a stop is shown (see ModuleStopHook). A target created after the import therefore
+    gets its categories at its first stop, e.g. "target variable" before launching or a core file does not
+    show formatted values.'''
+    lazy = g_settings['lazy-categories']
+    names = set(loadedModuleNames(debugger)) if lazy else None
+    symbols = {}
+    for name, detect, register in FORMATTER_CATEGORIES:
+        if not lazy:
+            wanted = True
+        elif isinstance(detect, str):
+            if detect not in symbols:
+                symbols[detect] = hasSymbol(debugger, detect)
+            wanted = symbols[detect]
+        else:
+            wanted = any(detect.match(n) for n in names)
+        category = g_categories.get(name)
+        if wanted and category is None:
+            category = g_categories[name] = debugger.CreateCategory(name)
+            register(category)
+        if category is not None and category.GetEnabled() != wanted:
+            category.SetEnabled(wanted)
+
+
+@report_exceptions
+def __lldb_init_module(debugger, dict):
+    print("Loading MAD extensions...")
+
+    startModuleListener(debugger)
+
+    # The stop hook applies module events (caches, lazy categories) before a stop is shown.
+    # Without a selected target it goes to the dummy target, which passes it on to new targets.
+    result = lldb.SBCommandReturnObject()
+    debugger.GetCommandInterpreter().HandleCommand('target stop-hook add -P lldbmad.ModuleStopHook', result)
+    updateCategories(debugger)
+
     debugger.HandleCommand('command script add -f lldbmad.vfptr vfptr')
+    debugger.HandleCommand('command script add -f lldbmad.qobjecttree qobjecttree')
+    debugger.HandleCommand('command script add -f lldbmad.mad mad')
@@ -0,0 +1,110 @@
+#include <QCoreApplication>
+
+#include <QDebug>
+#include <QHash>
+#include <QJsonArray>
+#include <QJsonDocument>
+#include <QJsonObject>
+#include <QList>
+#include <QMap>
+#include <QObject>
+#include <QString>
+
+// Large data sets for tests/bench.py. Each "// BENCH" line gets a breakpoint, at which the
+// runner times the summary and the expansion of the variable, or an lldb command.
+
+void bnch() {}
+
+void lists()
+{
+    QList<int> intList;
+    intList.reserve(1000000);
+    for (int i = 0; i < 1000000; ++i)
+        intList.append(i);
+
+    QList<QString> stringList;
+    stringList.reserve(1000000);
+    for (int i = 0; i < 1000000; ++i)
+        stringList.append(QString::number(i));
+
+    bnch(); // BENCH("intList")
+    bnch(); // BENCH("stringList")
+}
+
+void maps()
+{
+    QMap<int, QString> intMap;
+    QHash<QString, int> stringHash;
+    for (int i = 0; i < 100000; ++i) {
+        intMap.insert(i, QString::number(i));
+        stringHash.insert(QString::number(i), i);
+    }
+
+    bnch(); // BENCH("intMap")
+    bnch(); // BENCH("stringHash")
+}
+
+void strings()
+{
+    // 10 MB of UTF-16
+    QString bigString(5 * 1024 * 1024, QChar('x'));
+
+    bnch(); // BENCH("bigString")
+}
+
+void objects()
+{
+    // 50 objects with 1000 children each
+    QObject wideRoot;
+    wideRoot.setObjectName("wideRoot");
+    for (int i = 0; i < 50; ++i) {
+        QObject *group = new QObject(&wideRoot);
+        group->setObjectName(QString("group%1").arg(i));
+        for (int j = 0; j < 1000; ++j)
+            (new QObject(group))->setObjectName(QString("object%1.%2").arg(i).arg(j));
+    }
+
+    // A chain of 1000 objects
+    QObject deepRoot;
+    QObject *parent = &deepRoot;
+    for (int i = 0; i < 1000; ++i)
+        parent = new QObject(parent);
+
+    bnch(); // BENCH("wideRoot")
+    bnch(); // BENCH_COMMAND("qobjecttree &wideRoot")
+    bnch(); // BENCH_COMMAND("qobjecttree &deepRoot")
+}
+
+void json()
+{
+    QJsonArray items;
+    QJsonObject index;
+    for (int i = 0; i < 100000; ++i) {
+        const QString name = QString("item%1").arg(i);
+        items.append(QJsonObject({{"id", i}, {"name", name}, {"value", i * 0.5}}));
+        index.insert(name, i);
+    }
+    QJsonDocument arrayDocument(items);
+    QJsonDocument objectDocument(index);
+
+    QJsonArray jsonArray = arrayDocument.array();
+    QJsonObject jsonObject = objectDocument.object();
+
+    bnch(); // BENCH("jsonArray")
+    bnch(); // BENCH("jsonObject")
+}
+
+int main(int argc, char *argv[])
+{
+    QCoreApplication a(argc, argv);
+
+    qDebug() << "Qt Version: " << qVersion();
+
+    lists();
+    maps();
+    strings();
+    objects();
+    json();
+
+    return 0;
+}
@@ -8,20 +8,24 @@
 
 #include <memory>
 #include <QHash>
+#include <QSet>
 #include <QFile>
 #include <QFileInfo>
 #include <QPair>
 #include <QUrl>
 #include <QTextCursor>
 #include <QTextDocument>
+#include <QTimer>
 
 #include <QStringView>
+#include <QCborMap>
 #include <QJsonArray>
 #include <QJsonDocument>
 #include <QJsonObject>
 #include <QJsonValue>
 
 #include <QKeySequence>
+#include <QDateTime>
 
 #include <vector>
 
@@ -30,11 +34,7 @@ void chk() {}
 void qString()
 {
     QStringList test({"Hallo", "Welt"});
-#if QT_VERSION >= QT_VERSION_CHECK(6, 0, 0)
-    chk(); // CHECK("test", "size=2", {'[0]': '"Hallo"', '[1]': '"Welt"'})
-#else
-    chk(); // CHECK("test", None, { 0: {'[0]': '"Hallo"', '[1]': '"Welt"'}})
-#endif
+    chk(); // CHECK("test", "size=2", {'[0]': '"Hallo"', '[1]': '"Welt"'}) if QT_MAJOR() == 6 else CHECK("test", None, { 0: {'[0]': '"Hallo"', '[1]': '"Welt"'}})
 
     std::vector<QString> testVector{"Hallo", "Welt"};
     chk(); // CHECK("testVector", "size=2", {'[0]': '"Hallo"', '[1]': '"Welt"'} )
@@ -54,17 +54,23 @@ void qString()
 
     QStringView svLeft = sv.left(4);
     chk(); // CHECK_SUMMARY("svLeft", '"Just"')
+
+    QString longString(20000, QLatin1Char('x'));
+    chk(); // CHECK("longString", '"' + 'x' * 10000 + '"...', {'size': 20000, 'ptr': None, 'd': None, '[full]': '"' + 'x' * 20000 + '"'})
+    QStringView longView(longString);
+    chk(); // CHECK("longView", '"' + 'x' * 10000 + '"...', {'m_size': 20000, 'm_data': None, '[full]': '"' + 'x' * 20000 + '"'})
 }
 
 void qObject()
 {
     QObject *qObj = new QObject();
     qObj->setObjectName("Object_Name_Here");
-    chk(); // CHECK_SUMMARY("qObj", '{"Object_Name_Here"}')
+    chk(); // CHECK_SUMMARY("qObj", 'QObject{"Object_Name_Here"}')
 
     QObject *qObjNoName = new QObject(qObj);
     qObjNoName->setProperty("Test", "Hallo");
     qObjNoName->setProperty("2te Property", 1234);
+    chk(); // CHECK_SUMMARY("qObjNoName", 'QObject{}')
 }
 
 void qMap()
@@ -80,6 +86,7 @@ void qMap()
     floatMap["key2"] = 2.01234f;
     floatMap["key3"] = 3.01234f;
     floatMap["key4"] = 4.01234f;
+    chk(); // CHECK("floatMap", 'size=4', {'["key1"]': None, '["key2"]': None, '["key3"]': None, '["key4"]': None})
 }
 
 void qVariant()
@@ -92,7 +99,13 @@ void qVariant()
     QVariant stringVar(QString("Hallo Welt! Ihr bubbas seid ja mal blah blah blah blah blah blah blah"));
     chk(); // CHECK_SUMMARY("stringVar", '([QString] = "Hallo Welt! Ihr bubbas seid ja mal blah blah blah blah blah blah blah")')
     QVariant byteVar(QByteArray("awfoiaf\1oaw\2hifafohwaof"));
-    chk(); // CHECK_SUMMARY("byteVar", '([QByteArray] = size=23)')
+    chk(); // CHECK_SUMMARY("byteVar", '([QByteArray] = size=23 [61 77 66 6f 69 61 66 01 6f 61 77 02 68 69 66 61 66 6f 68 77 61 6f 66])')
+    QByteArray bytes("Hallo");
+    chk(); // CHECK("bytes", 'size=5 "Hallo"', {'[0]': 72, '[1]': 97, '[2]': 108, '[3]': 108, '[4]': 111})
+    chk(); // CHECK_PREFETCH("bytes")
+
+    QVariant longVar(Q_INT64_C(1234567890123));
+    chk(); // CHECK_SUMMARY("longVar", '([qlonglong] = 1234567890123)')
 
     intVar = "Hallo Welt du int";
 
@@ -100,12 +113,29 @@ void qVariant()
     QVariant rectVar(r);
 
     QVariant sharedVar(stringVar);
+    chk(); // CHECK_SUMMARY("sharedVar", '([QString] = "Hallo Welt! Ihr bubbas seid ja mal blah blah blah blah blah blah blah")')
+
+    // Larger than the inline buffer of QVariant, so it is stored in a PrivateShared
+    QVariant bigVar(QRectF(1, 2, 3, 4));
+    chk(); // CHECK_CHILDREN("bigVar", {'[QRectF]': {'xp': 1, 'yp': 2, 'w': 3, 'h': 4}})
+    QVariant bigCopy(bigVar);
+    chk(); // CHECK_CHILDREN("bigCopy", {'[QRectF]': {'xp': 1, 'yp': 2, 'w': 3, 'h': 4}})
 }
 
 void qHash()
 {
     QHash<int, QPair<int, int>> testHash;
     testHash[10] = QPair<int, int>(10, 12);
+    chk(); // CHECK_SUMMARY("testHash", 'size=1')
+    chk(); // CHECK_CHILDREN("testHash", {'[10]': {'first': 10, 'second': 12}})
+
+    QSet<QString> testSet{"one"};
+    chk(); // CHECK("testSet", 'size=1', {'[0]': '"one"'})
+
+    QMultiHash<int, int> testMultiHash;
+    testMultiHash.insert(1, 10);
+    testMultiHash.insert(1, 11);
+    chk(); // CHECK_SUMMARY("testMultiHash", 'size=2')
 
     for (auto it = testHash.begin(); it != testHash.end(); ++it)
     {
@@ -116,11 +146,17 @@ void qHash()
 void json()
 {
     QJsonArray arr({123, 234, 533});
+    chk(); // CHECK("arr", 'size=3', {'[0]': 123, '[1]': 234, '[2]': 533, '[private]': None})
 
     QJsonObject obj({{"key1", "value1"}, {"key2", "value2"}});
+    chk(); // CHECK("obj", 'size=2', {'["key1"]': '"value1"', '["key2"]': '"value2"', '[private]': None})
+
+    QCborMap cborMap({{"name", "lldbmad"}, {"version", 2}});
+    chk(); // CHECK("cborMap", 'size=2', {'["name"]': '"lldbmad"', '["version"]': 2, '[private]': None})
 
     qDebug() << arr;
     qDebug() << obj;
+    qDebug() << cborMap;
 }
 
 void file()
@@ -216,11 +252,24 @@ void qKeySequence()
     chk(); // CHECK_SUMMARY("complex", '"A, Ctrl+"')
     chk(); // CHECK_SUMMARY("moreComplex", '"Ctrl+K, Ctrl+F"')
     chk(); // CHECK_SUMMARY("superComplex", '"Ctrl+Shift+K, Ctrl+Alt+F"')
+    chk(); // CHECK_CHILDREN("moreComplex", {'[0]': None, '[1]': None})
+}
+
+void dateTime()
+{
+    QDateTime utc(QDate(2024, 1, 2), QTime(3, 4, 5, 6), Qt::UTC);
+    chk(); // CHECK_SUMMARY("utc", '"2024-01-02T03:04:05.006Z"')
+
+    QDateTime offset(QDate(2024, 1, 2), QTime(3, 4, 5, 6), Qt::OffsetFromUTC, 5400);
+    chk(); // CHECK_SUMMARY("offset", '"2024-01-02T03:04:05.006+01:30"')
+
+    QDateTime invalid;
+    chk(); // CHECK_SUMMARY("invalid", '<invalid>')
 }
 
 int main(int argc, char *argv[])
 {
-    QCoreApplication a(argc, argv);
+    QCoreApplication app(argc, argv);
 
     qDebug() << "Qt Version: " << qVersion();
 
@@ -235,6 +284,14 @@ int main(int argc, char *argv[])
     qString();
     qList();
     qKeySequence();
+    dateTime();
+
+    QTimer *timer = new QTimer(&app);
+    timer->setObjectName("timer");
+    QObject *worker = new QObject(&app);
+    worker->setObjectName("worker");
+    new QTimer(worker);
+    chk(); // CHECK_COMMAND("qobjecttree &app --class Timer", [r'1: QTimer\{"timer"\} 0x[0-9a-f]+ \(parent 0x[0-9a-f]+\)', r'2: QTimer 0x[0-9a-f]+ \(parent 0x[0-9a-f]+\)', r'\d+ objects'])
 
     float floatValue = 1.0f;
 
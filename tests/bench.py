@@ -0,0 +1,243 @@
+import lldb
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Times the lldbmad formatters on the large data sets of test-app/bench.cpp.
+#
+#   python3 tests/bench.py <lldbbench> [--output results.json] [--repeat 3] [--expand-limit 1000]
+#   python3 tests/bench.py --compare old.json new.json
+
+
+# Create a new debugger instance
+debugger = lldb.SBDebugger.Create()
+if "SkipAppInitFiles" in dir(debugger):
+    debugger.SkipAppInitFiles(True)
+if "SkipLLDBInitFiles" in dir(debugger):
+    debugger.SkipLLDBInitFiles(True)
+
+debugger.HandleCommand('command script import lldbmad.py')
+import lldbmad
+
+# When we step or continue, don't return from the function until the process
+# stops. We do this by setting the async mode to false.
+debugger.SetAsync (False)
+
+options = None
+results = {}
+
+
+def timed(func, memoized=False):
+    '''Runs func "repeat" times, returns (median seconds, min seconds, last result).
+    Unless "memoized" is set, results remembered for the stop (see lldbmad.StopMemo) are dropped before
+    every run, so each run measures the formatters and not a lookup of the previous run's result.'''
+    durations = []
+    result = None
+    for i in range(options.repeat):
+        if not memoized:
+            lldbmad.g_stopMemo.clear()
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations), min(durations), result
+
+
+def currentFrame():
+    return debugger.GetSelectedTarget().GetProcess().GetSelectedThread().GetSelectedFrame()
+
+
+def expand(value, limit):
+    '''Fetches the children of a value and their summaries, like an IDE expanding it.'''
+    count = value.GetNumChildren()
+    if limit:
+        count = min(count, limit)
+    for i in range(0, count):
+        child = value.GetChildAtIndex(i)
+        child.GetSummary()
+        child.GetValue()
+    return count
+
+
+def BENCH(expression):
+    print('\tBenchmarking "%s" ...' % expression, flush=True)
+
+    # Look the variable up for every run, lldb caches summaries and children per SBValue
+    def summary():
+        value = currentFrame().FindVariable(expression)
+        if not value.IsValid():
+            raise Exception('Could not find variable by name "%s"' % expression)
+        return value.GetSummary()
+
+    def expansion():
+        return expand(currentFrame().FindVariable(expression), options.expand_limit)
+
+    try:
+        median, fastest, text = timed(summary)
+        results['%s summary' % expression] = {'median': median, 'min': fastest}
+        print('\t\tsummary: %.2f ms (%s)' % (median * 1000, (text or '')[:60]))
+
+        # The same variable asked for again during the stop, as front ends do
+        lldbmad.g_stopMemo.clear()
+        summary()
+        median, fastest, text = timed(summary, memoized=True)
+        results['%s summary memoized' % expression] = {'median': median, 'min': fastest}
+        print('\t\tsummary memoized: %.2f ms' % (median * 1000))
+
+        median, fastest, count = timed(expansion)
+        results['%s expand' % expression] = {'median': median, 'min': fastest, 'children': count}
+        print('\t\texpand: %.2f ms (%i children)' % (median * 1000, count))
+        return True
+    except Exception as e:
+        print(e, flush=True)
+        return False
+
+
+def BENCH_COMMAND(command):
+    print('\tBenchmarking command "%s" ...' % command, flush=True)
+
+    def run():
+        result = lldb.SBCommandReturnObject()
+        debugger.GetCommandInterpreter().HandleCommand(command, result)
+        if not result.Succeeded():
+            raise Exception(result.GetError())
+        return len(result.GetOutput() or '')
+
+    try:
+        median, fastest, size = timed(run)
+        results['%s command' % command] = {'median': median, 'min': fastest}
+        print('\t\t%.2f ms (%i bytes of output)' % (median * 1000, size))
+        return True
+    except Exception as e:
+        print(e, flush=True)
+        return False
+
+
+def read_source():
+    breakPoints = []
+    cmds = {}
+
+    target = debugger.GetSelectedTarget()
+
+    print("Reading source ...")
+    with open('test-app/bench.cpp', 'r') as f:
+        lineNumber = 0
+        for line in f:
+            lineNumber = lineNumber+1
+            if "// BENCH" in line:
+                line = line[line.index("// BENCH") + len("// "):].strip('\r\n')
+                breakpoint = target.BreakpointCreateByLocation('bench.cpp', lineNumber)
+                breakpoint.SetAutoContinue(False)
+
+                if breakpoint.GetNumLocations() != 1:
+                    print("Could not create a single breakpoint at line %i" % lineNumber)
+                    target.BreakpointDelete(breakpoint.GetID())
+                    continue
+
+                breakPoints.append(breakpoint)
+                cmds[lineNumber] = line
+
+    print("Done reading source.")
+    return (breakPoints, cmds)
+
+
+def gitRevision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(oldFile, newFile):
+    with open(oldFile) as f:
+        old = json.load(f)
+    with open(newFile) as f:
+        new = json.load(f)
+
+    print('%-45s %12s %12s %8s' % ('benchmark', old.get('revision') or oldFile, new.get('revision') or newFile, 'ratio'))
+    for name in sorted(set(old['results']) | set(new['results'])):
+        before = old['results'].get(name, {}).get('median')
+        after = new['results'].get(name, {}).get('median')
+        ratio = '%7.2fx' % (after / before) if before and after else '-'
+        print('%-45s %12s %12s %8s' % (name,
+                                        '%.2f ms' % (before * 1000) if before is not None else '-',
+                                        '%.2f ms' % (after * 1000) if after is not None else '-',
+                                        ratio))
+    return 0
+
+
+def main(args):
+    global options
+
+    parser = argparse.ArgumentParser(description='Benchmarks the lldbmad formatters')
+    parser.add_argument('executable', nargs='?')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs per benchmark')
+    parser.add_argument('--expand-limit', type=int, default=1000,
+                        help='Maximum number of children fetched when expanding a value, 0 for all')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two result files')
+    options = parser.parse_args(args)
+
+    if options.compare:
+        return compare(*options.compare)
+
+    if not options.executable:
+        parser.error('the executable is required')
+
+    print('Creating a target for "%s"' % options.executable)
+    target = debugger.CreateTargetWithFileAndArch (options.executable, lldb.LLDB_ARCH_DEFAULT)
+
+    if not target:
+        print('Error creating target')
+        return 1
+
+    bps, cmds = read_source()
+
+    if len(bps) == 0:
+        print('No benchmarks found in source')
+        return 2
+
+    print("Starting process ...")
+    process = target.LaunchSimple (None, None, os.getcwd())
+
+    failed = False
+    for i in range(0, len(bps)):
+        if process.GetState() != lldb.eStateStopped:
+            print('Process is not stopped, but in state %i' % process.GetState())
+            return 3
+
+        line = currentFrame().GetLineEntry().GetLine()
+        print('RUN (%i/%i) line %i' % (i, len(bps), line), flush=True)
+        if not eval(cmds[line]):
+            failed = True
+
+        process.Continue()
+
+    report = {
+        'revision': gitRevision(),
+        'date': datetime.datetime.now().isoformat(),
+        'lldb': debugger.GetVersionString(),
+        'qt': '.'.join(map(str, lldbmad.targetState(target).getQtVersion())),
+        'repeat': options.repeat,
+        'expandLimit': options.expand_limit,
+        'results': results,
+    }
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print('Results written to "%s"' % options.output)
+    else:
+        print(json.dumps(report, indent=2))
+
+    return 4 if failed else 0
+
+if __name__ == '__main__':
+    exitCode = main(sys.argv[1:])
+    if exitCode != 0:
+        print('FAILED', exitCode)
+        exit(exitCode)
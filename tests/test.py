@@ -1,6 +1,14 @@
 import lldb
-import sys
+import argparse
+import contextlib
+import io
+import json
 import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
 
 
 # Create a new debugger instance
@@ -43,6 +51,13 @@ def check(debugger, value, expr, expected):
         raise Exception('\t\tFAILED: Expected "%s" = %s, got "%s" = %s' % (expr, expected, expr, value.GetValueAsSigned()))
 
 
+def QT_MAJOR():
+    '''The major Qt version of the test app, for checks that differ between Qt versions:
+    CHECK(...) if QT_MAJOR() == 6 else CHECK(...)'''
+    import lldbmad
+    return lldbmad.targetState(debugger.GetSelectedTarget()).getQtVersion()[0]
+
+
 def CHECK_SUMMARY(expression, expected_summary):
     global debugger
     target = debugger.GetSelectedTarget()
@@ -86,11 +101,93 @@ def CHECK_CHILDREN(expression, expected_children):
 def CHECK(expression, expected_summary, expected_children):
     return CHECK_SUMMARY(expression, expected_summary) and CHECK_CHILDREN(expression, expected_children)
 
-def read_source():
-    breakPoints = []
-    cmds = []
 
+def memoizedStops(process, address):
+    '''Returns the stop IDs of the remembered results for "address".'''
+    import lldbmad
+    return {key[1] for key in lldbmad.g_stopMemo.entries
+            if key[0] == process.GetUniqueID() and key[2] == address}
+
+
+def CHECK_PREFETCH(expression):
+    '''Runs lldbmad.PrefetchStopHook for the current stop and checks that the summary of the variable is
+    remembered for this stop only.'''
+    global debugger
+    import lldbmad
     target = debugger.GetSelectedTarget()
+    process = target.GetProcess()
+    currentFrame = process.GetSelectedThread().GetSelectedFrame()
+    print('\tChecking prefetch ... ("%s")' % expression, flush=True)
+
+    value = currentFrame.FindVariable(expression)
+    if not value.IsValid():
+        print('!! Could not find variable by name "%s"' % expression)
+        return False
+    address = value.GetLoadAddress()
+
+    lldbmad.g_stopMemo.clear()
+    hook = lldbmad.PrefetchStopHook(target, None, {})
+    hook.handle_stop(lldb.SBExecutionContext(currentFrame), lldb.SBStream())
+    stopId = process.GetStopID(True)
+    if memoizedStops(process, address) != {stopId}:
+        print('\t\tFAILED: Expected the summary to be remembered for stop %i, got %s'
+              % (stopId, memoizedStops(process, address)))
+        return False
+
+    # Evaluating an expression resumes the process, which invalidates what was remembered
+    currentFrame.EvaluateExpression('(int)0')
+    if process.GetStopID(True) == stopId:
+        print('\t\tFAILED: The expression did not resume the process')
+        return False
+    summary = currentFrame.FindVariable(expression).GetSummary()
+    if stopId in memoizedStops(process, address):
+        print('\t\tFAILED: The result of stop %i was used after the process resumed' % stopId)
+        return False
+    if summary != value.GetSummary():
+        print('\t\tFAILED: Expected "%s" after resuming, got "%s"' % (value.GetSummary(), summary))
+        return False
+
+    print('\t\tPASSED')
+    return True
+
+def CHECK_COMMAND(command, expected_lines):
+    '''Runs an lldb command and checks that each line it writes to the debugger's output, followed by the
+    output kept in its result, matches the regular expression at the same position in "expected_lines".'''
+    global debugger
+    print('\tChecking command ... ("%s")' % command, flush=True)
+
+    result = lldb.SBCommandReturnObject()
+    previousOutput = debugger.GetOutputFile()
+    with tempfile.TemporaryFile('w+') as output:
+        debugger.SetOutputFile(lldb.SBFile.Create(output, borrow=True))
+        try:
+            debugger.GetCommandInterpreter().HandleCommand(command, result)
+        finally:
+            debugger.SetOutputFile(previousOutput)
+        output.seek(0)
+        written = output.read()
+    if not result.Succeeded():
+        print('\t\tFAILED: "%s" failed: %s' % (command, result.GetError()))
+        return False
+
+    lines = written.splitlines() + (result.GetOutput() or '').splitlines()
+    lines = result.GetOutput().splitlines()
+    print('\t"%s" => %s (should match %s)' % (command, lines, expected_lines))
+    if len(lines) != len(expected_lines):
+        print('\t\tFAILED: Expected %i lines, got %i' % (len(expected_lines), len(lines)))
+        return False
+    for line, expected in zip(lines, expected_lines):
+        if not re.fullmatch(expected, line):
+            print('\t\tFAILED: Expected a line matching "%s", got "%s"' % (expected, line))
+            return False
+
+    print('\t\tPASSED')
+    return True
+
+
+def read_checks():
+    '''Returns the CHECK commands of the test app as a list of (command, line number).'''
+    cmds = []
 
     print("Reading source ...")
     with open('test-app/main.cpp', 'r') as f:
@@ -99,86 +196,211 @@ def read_source():
             lineNumber = lineNumber+1
             if "// CHECK" in line:
                 line = line[line.index("// CHECK") + len("// "):].strip('\r\n')
-                # Create a breakpoint at the line
-                breakpoint = target.BreakpointCreateByLocation('main.cpp', lineNumber)
-                breakpoint.SetAutoContinue(False)
-                breakpoint.SetEnabled(False)
-
-                if breakpoint.GetNumLocations() == 0:
-                    print("Could not create breakpoint at line %i" % lineNumber)
-                    continue
-                if breakpoint.GetNumLocations() > 1:
-                    print("Warning: Multiple locations for breakpoint at line %i, Ignoring..." % lineNumber)
-                    continue
-                location = breakpoint.GetLocationAtIndex(0)
-                if location.GetAddress().GetLineEntry().GetLine() != lineNumber:
-                    print("Warning: Breakpoint at line %i is at line %i, Ignoring..." % (lineNumber, location.GetAddress().GetLineEntry().GetLine()))
-                    continue
                 print("Found check in line %i: %s" % (lineNumber, line))
-
-                breakpoint.SetEnabled(True)
-                breakPoints.append(breakpoint)
                 cmds.append((line, lineNumber))
 
     print("Done reading source.")
-    return (breakPoints, cmds)
+    return cmds
+
+
+def create_breakpoints(checks):
+    '''Creates breakpoints for the given checks only. Returns the breakpoints, the commands by
+    line number and the checks that could not get a breakpoint.'''
+    breakPoints = []
+    cmds = {}
+    skipped = []
+
+    target = debugger.GetSelectedTarget()
+
+    for line, lineNumber in checks:
+        # Create a breakpoint at the line
+        breakpoint = target.BreakpointCreateByLocation('main.cpp', lineNumber)
+        breakpoint.SetAutoContinue(False)
+
+        reason = None
+        if breakpoint.GetNumLocations() == 0:
+            reason = "Could not create breakpoint at line %i" % lineNumber
+        elif breakpoint.GetNumLocations() > 1:
+            reason = "Warning: Multiple locations for breakpoint at line %i, Ignoring..." % lineNumber
+        else:
+            actualLine = breakpoint.GetLocationAtIndex(0).GetAddress().GetLineEntry().GetLine()
+            if actualLine != lineNumber:
+                reason = "Warning: Breakpoint at line %i is at line %i, Ignoring..." % (lineNumber, actualLine)
+
+        if reason:
+            print(reason)
+            target.BreakpointDelete(breakpoint.GetID())
+            skipped.append({'line': lineNumber, 'check': line, 'status': 'SKIPPED', 'seconds': 0, 'output': reason})
+            continue
+
+        breakPoints.append(breakpoint)
+        cmds[lineNumber] = line
+
+    return (breakPoints, cmds, skipped)
 
 
 def do_check(process, cmds):
+    '''Runs the check of the line the process stopped at. Returns its result, or None if the
+    process did not stop at a check.'''
     state = process.GetState()
 
     if state == lldb.eStateExited:
         print('Process exited??')
-        return False
+        return None
 
     if state != lldb.eStateStopped:
         print('Process is not stopped, but in state %i' % state)
-        return False
+        return None
 
     currentFrame = process.GetSelectedThread().GetSelectedFrame()
     print('Current frame: %s' % currentFrame)
 
-    cmd = next(cmd for cmd in cmds if cmd[1] == currentFrame.GetLineEntry().GetLine())
+    lineNumber = currentFrame.GetLineEntry().GetLine()
+    cmd = cmds.get(lineNumber)
 
     if not cmd:
-        print('Could not find command for line %i' % actualLine)
-        return False
+        print('Could not find command for line %i' % lineNumber)
+        return None
 
-    if not eval(cmd[0]):
-        return False
-    
-    return True
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        try:
+            passed = eval(cmd)
+        except Exception as e:
+            print(e)
+            passed = False
+    seconds = time.perf_counter() - start
 
-def main(args):
+    return {'line': lineNumber, 'check': cmd, 'status': 'PASSED' if passed else 'FAILED',
+            'seconds': seconds, 'output': output.getvalue()}
+
+
+def run_checks(executable, checks):
+    '''Runs the given checks in one inferior, returns their results.'''
     # Create a target from a file and arch
-    print('Creating a target for "%s"' % args[0])
+    print('Creating a target for "%s"' % executable)
 
-    target = debugger.CreateTargetWithFileAndArch (args[0], lldb.LLDB_ARCH_DEFAULT)
+    target = debugger.CreateTargetWithFileAndArch (executable, lldb.LLDB_ARCH_DEFAULT)
 
     if not target:
-        print('Error creating target')
-        return 1
-
-    bps, cmds = read_source()
+        raise Exception('Error creating target')
 
-    if len(bps) == 0:
-        print('No checks found in source')
-        return 2
+    bps, cmds, results = create_breakpoints(checks)
 
     print("Starting process ...")
     process = target.LaunchSimple (None, None, os.getcwd())
 
     for i in range(0, len(bps)):
         print('RUN (%i/%i)' %(i, len(bps)), flush=True)
-        if not do_check(process, cmds):
-            return 3
+        result = do_check(process, cmds)
+        if not result:
+            break
 
+        results.append(result)
+        cmds.pop(result['line'])
         process.Continue()
 
+    # Checks whose breakpoint was never hit
+    for lineNumber, line in cmds.items():
+        results.append({'line': lineNumber, 'check': line, 'status': 'NOT REACHED', 'seconds': 0, 'output': ''})
+
+    if process.IsValid() and process.GetState() != lldb.eStateExited:
+        process.Kill()
+
+    return results
+
+
+def run_shards(executable, checks, jobs):
+    '''Splits the checks into shards, runs each shard in its own lldb process and merges the results.'''
+    shards = [checks[i::jobs] for i in range(jobs)]
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workers = []
+        for i, shard in enumerate(shards):
+            checksFile = os.path.join(tmp, 'checks-%i.json' % i)
+            reportFile = os.path.join(tmp, 'report-%i.json' % i)
+            with open(checksFile, 'w') as f:
+                json.dump(shard, f)
+            log = open(os.path.join(tmp, 'log-%i.txt' % i), 'w+')
+            worker = subprocess.Popen([sys.executable, __file__, executable, '--shard', checksFile,
+                                       '--report', reportFile], stdout=log, stderr=subprocess.STDOUT)
+            workers.append((i, shard, worker, reportFile, log))
+
+        for i, shard, worker, reportFile, log in workers:
+            worker.wait()
+            try:
+                with open(reportFile) as f:
+                    results += json.load(f)
+            except (OSError, ValueError):
+                log.seek(0)
+                print('Shard %i failed (exit code %i):\n%s' % (i, worker.returncode, log.read()))
+                results += [{'line': lineNumber, 'check': line, 'status': 'NOT REACHED', 'seconds': 0, 'output': ''}
+                            for line, lineNumber in shard]
+            log.close()
+
+    return results
+
+
+def print_report(results, seconds):
+    for result in sorted(results, key=lambda r: r['line']):
+        print('%-11s line %4i %9.1f ms  %s' % (result['status'], result['line'], result['seconds'] * 1000,
+                                             result['check']))
+        if result['status'] != 'PASSED' and result['output']:
+            print('\t' + result['output'].rstrip().replace('\n', '\n\t'))
+
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    print('%s in %.1f s' % (', '.join('%i %s' % (n, status) for status, n in sorted(counts.items())), seconds))
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Runs the CHECKs of test-app/main.cpp')
+    parser.add_argument('executable')
+    parser.add_argument('--jobs', '-j', type=int, default=min(os.cpu_count() or 1, 4),
+                        help='Number of lldb processes running checks in parallel')
+    # Used internally to run a single shard
+    parser.add_argument('--shard', help=argparse.SUPPRESS)
+    parser.add_argument('--report', help=argparse.SUPPRESS)
+    options = parser.parse_args(args)
+
+    if options.shard:
+        with open(options.shard) as f:
+            checks = [tuple(check) for check in json.load(f)]
+        results = run_checks(options.executable, checks)
+        with open(options.report, 'w') as f:
+            json.dump(results, f)
+        return 0
+
+    checks = read_checks()
+
+    if len(checks) == 0:
+        print('No checks found in source')
+        return 2
+
+    start = time.perf_counter()
+    jobs = max(1, min(options.jobs, len(checks)))
+    if jobs == 1:
+        try:
+            results = run_checks(options.executable, checks)
+        except Exception as e:
+            print(e)
+            return 1
+    else:
+        print('Running %i checks in %i shards ...' % (len(checks), jobs), flush=True)
+        results = run_shards(options.executable, checks, jobs)
+
+    print_report(results, time.perf_counter() - start)
+
+    if any(result['status'] in ('FAILED', 'NOT REACHED') for result in results):
+        return 3
+
     return 0
 
 if __name__ == '__main__':
     exitCode = main(sys.argv[1:])
     if exitCode != 0:
         print('FAILED', exitCode)
-        exit(exitCode)
\ No newline at end of file
+        exit(exitCode)
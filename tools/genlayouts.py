@@ -0,0 +1,104 @@
+import lldb
+import argparse
+import ast
+import os
+import sys
+
+# Generates the layout tables of Qt private classes (lldbmad.PRIVATE_LAYOUTS) from a debug build.
+# The executable has to link against a Qt with debug info for its private classes.
+#
+#   python3 tools/genlayouts.py <executable>                    prints the layouts of its Qt version
+#   python3 tools/genlayouts.py <executable> --update lldbmad.py  merges them into the table of lldbmad.py
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import lldbmad
+
+BEGIN_MARKER = '# BEGIN PRIVATE_LAYOUTS\n'
+END_MARKER = '# END PRIVATE_LAYOUTS\n'
+
+
+def layoutsOf(target):
+    '''Returns {type name: {member: (offset, type name)}} for the private classes found in the debug info.'''
+    layouts = {}
+    for typeName, (module, members) in sorted(lldbmad.PRIVATE_TYPES.items()):
+        t = target.FindFirstType(typeName)
+        if not t.IsValid():
+            print('No debug info for "%s"' % typeName, file=sys.stderr)
+            continue
+
+        layout = {}
+        for member in members:
+            found = lldbmad.findField(t, member)
+            if found is None:
+                print('"%s" has no member "%s"' % (typeName, member), file=sys.stderr)
+                continue
+            layout[member] = (found[0], found[1].GetName())
+        layouts[typeName] = layout
+    return layouts
+
+
+def render(tables):
+    lines = ['PRIVATE_LAYOUTS = {']
+    for key in sorted(tables):
+        lines.append('    %r: {' % (key,))
+        for typeName in sorted(tables[key]):
+            lines.append('        %r: {' % typeName)
+            for member, entry in sorted(tables[key][typeName].items()):
+                lines.append('            %r: %r,' % (member, tuple(entry)))
+            lines.append('        },')
+        lines.append('    },')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def parse(block):
+    '''Returns the tables of a "PRIVATE_LAYOUTS = {...}" block as written by render().'''
+    return ast.literal_eval(block[block.index('=') + 1:])
+
+
+def update(fileName, key, layouts):
+    with open(fileName) as f:
+        source = f.read()
+    begin = source.index(BEGIN_MARKER) + len(BEGIN_MARKER)
+    end = source.index(END_MARKER)
+
+    # Merge into the table of the file that is rewritten, which need not be the imported module
+    tables = parse(source[begin:end])
+    tables[key] = {**tables.get(key, {}), **layouts}
+    with open(fileName, 'w') as f:
+        f.write(source[:begin] + render(tables) + source[end:])
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Generates the layout tables of Qt private classes')
+    parser.add_argument('executable')
+    parser.add_argument('--update', metavar='FILE', help='Merge the layouts into the table of this file')
+    options = parser.parse_args(args)
+
+    debugger = lldb.SBDebugger.Create()
+    target = debugger.CreateTargetWithFileAndArch(options.executable, lldb.LLDB_ARCH_DEFAULT)
+    if not target:
+        print('Error creating target')
+        return 1
+
+    version = lldbmad.detectQtVersion(target)
+    if version is None:
+        print('Could not determine the Qt version of "%s"' % options.executable)
+        return 2
+
+    key = (version[0], version[1], target.GetAddressByteSize())
+    layouts = layoutsOf(target)
+    if not layouts:
+        print('No private classes found, is the debug info of Qt installed?')
+        return 3
+
+    if options.update:
+        update(options.update, key, layouts)
+        print('Updated the layouts of Qt %i.%i, %i byte pointers in "%s"' % (key + (options.update,)))
+    else:
+        print(render({key: layouts}))
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main(sys.argv[1:]))